@@ -1,64 +1,98 @@
 import os, base64
 from PIL import Image
-from sentence_transformers import SentenceTransformer
 from langchain_openai import ChatOpenAI
+from summary_cache import SummaryCache, get_summary_cache
 
 _clip_model = None
 
 def get_clip_model():
     global _clip_model
     if _clip_model is None:
+        # torch 로딩이 무거우므로 CLIP이 실제로 필요할 때만 import
+        from sentence_transformers import SentenceTransformer
         print("📦 CLIP 모델 로딩 중...")
         _clip_model = SentenceTransformer("clip-ViT-B-32")
     return _clip_model
 
+CHAT_MODEL = "gpt-4o-mini"
+IMAGE_SUMMARY_PROMPT = "Summarize this image for retrieval. Provide concise summary for semantic search."
+
 def get_chat_model():
-    return ChatOpenAI(temperature=0, model="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY"))
+    return ChatOpenAI(temperature=0, model=CHAT_MODEL, api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_clip_embeddings(image_folder):
-    """CLIP 임베딩 + GPT-4o 요약 + 원본 경로"""
-    if not os.path.exists(image_folder):
-        return [], [], []
+def summarize_image_files(image_paths, use_cache=True):
+    """GPT-4o 요약 + 원본 경로 (CLIP 모델은 로딩하지 않음)
 
-    image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-    image_files = [f for f in sorted(os.listdir(image_folder)) if f.lower().endswith(image_extensions)]
-    if not image_files:
-        return [], [], []
+    image_paths: 처리할 이미지 파일 경로 목록 (extract_pdf_elements가 반환한 목록)
+    반환: (summaries, paths) - 두 리스트는 항상 같은 길이, 실패한 이미지는 제외
+    use_cache=True면 같은 이미지(내용 기준)의 요약을 캐시에서 재사용하여 GPT 호출 생략
+    """
+    if not image_paths:
+        return [], []
 
-    clip_model = get_clip_model()
     chat_model = get_chat_model()
+    cache = get_summary_cache() if use_cache else None
 
-    clip_embeddings, summaries, paths = [], [], []
-    prompt = "Summarize this image for retrieval. Provide concise summary for semantic search."
+    summaries, paths = [], []
+    prompt = IMAGE_SUMMARY_PROMPT
 
-    for fname in image_files:
-        img_path = os.path.join(image_folder, fname)
+    for img_path in image_paths:
+        fname = os.path.basename(img_path)
         try:
-            # CLIP 임베딩
-            img = Image.open(img_path).convert("RGB")
-            embedding = clip_model.encode(img)
-            clip_embeddings.append(embedding.tolist())
-            paths.append(img_path)
-
-            # base64 인코딩
             with open(img_path, "rb") as f:
-                img_base64 = base64.b64encode(f.read()).decode("utf-8")
-
-            # GPT-4o 요약
-            res = chat_model.invoke([
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"}}
-                    ]
-                }
-            ])
-            summaries.append(res.content if hasattr(res, "content") else str(res))
-
-            print(f"  ✓ {fname} 처리 완료")
+                img_bytes = f.read()
+
+            key = SummaryCache.make_key(img_bytes, CHAT_MODEL, prompt)
+            summary = cache.get(key) if cache is not None else None
+            if summary is None:
+                # base64 인코딩
+                img_base64 = base64.b64encode(img_bytes).decode("utf-8")
+
+                # GPT-4o 요약
+                res = chat_model.invoke([
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"}}
+                        ]
+                    }
+                ])
+                summary = res.content if hasattr(res, "content") else str(res)
+                if cache is not None:
+                    cache.put(key, summary)
+                print(f"  ✓ {fname} 처리 완료")
+            else:
+                print(f"  ✓ {fname} 처리 완료 (요약 캐시)")
+
+            # 요약까지 성공한 이미지만 추가 (두 리스트의 순서 유지)
+            summaries.append(summary)
+            paths.append(img_path)
         except Exception as e:
             print(f"  ❌ {fname} 처리 실패: {e}")
             continue
 
-    return clip_embeddings, summaries
+    return summaries, paths
+
+def generate_clip_embeddings(image_paths, use_cache=True):
+    """CLIP 임베딩 + GPT-4o 요약 + 원본 경로
+
+    반환: (clip_embeddings, summaries, paths) - 세 리스트는 항상 같은 길이, 실패한 이미지는 제외
+    CLIP 벡터가 필요 없으면 summarize_image_files 사용 (모델 로딩/인코딩 생략)
+    """
+    summaries, paths = summarize_image_files(image_paths, use_cache=use_cache)
+    if not paths:
+        return [], [], []
+
+    clip_model = get_clip_model()
+    clip_embeddings, kept_summaries, kept_paths = [], [], []
+    for summary, img_path in zip(summaries, paths):
+        try:
+            img = Image.open(img_path).convert("RGB")
+            clip_embeddings.append(clip_model.encode(img).tolist())
+            kept_summaries.append(summary)
+            kept_paths.append(img_path)
+        except Exception as e:
+            print(f"  ❌ {os.path.basename(img_path)} CLIP 임베딩 실패: {e}")
+
+    return clip_embeddings, kept_summaries, kept_paths
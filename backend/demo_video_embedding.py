@@ -3,16 +3,18 @@ from video_vectorStore import VideoVectorStore
 conv_id = "video_conv_1763127029420"
 
 store = VideoVectorStore(collection_name=conv_id)
-docs = store.get_all_documents()
 
-print(f"\n📦 저장된 문서 수: {len(docs)}개\n")
+print(f"\n📦 저장된 문서 수: {store.count()}개\n")
+
+# 페이지 단위로 순회하므로 컬렉션이 커도 메모리 사용량이 일정함
+docs = store.iter_documents(fields=['timestamp', 'audio_text', 'visual_description', 'frame_ref'])
 
 for i, doc in enumerate(docs):
     print(f"---- 문서 {i+1} ----")
     print(f"⏱ timestamp: {doc.metadata.get('timestamp')}")
     print(f"🗣 audio_text: {doc.metadata.get('audio_text')}")
     print(f"🎞 visual_description: {doc.metadata.get('visual_description')[:80]}...")
-    print(f"🖼 frame_base64 존재?: {'frame_base64' in doc.metadata}")
+    print(f"🖼 frame_ref: {doc.metadata.get('frame_ref')}")
     print(f"📄 summary 일부: {doc.page_content[:120]}...")
     print("-------------------------\n")
 
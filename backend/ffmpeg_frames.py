@@ -0,0 +1,137 @@
+import json
+import queue
+import re
+import subprocess
+import threading
+import numpy as np
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+"""FFmpeg 기반 핵심 프레임 추출: 장면 점수 select 필터 + 스케일링을 FFmpeg에서 처리"""
+
+_PTS_TIME_PATTERN = re.compile(r'pts_time:\s*(-?[\d.]+)')
+
+
+def probe_video_stream(video_path: str) -> Dict:
+    """FFprobe로 첫 번째 비디오 스트림의 크기와 fps 조회"""
+    command = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height,avg_frame_rate,r_frame_rate',
+        '-of', 'json',
+        video_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    streams = json.loads(result.stdout or '{}').get('streams', [])
+    if not streams:
+        raise RuntimeError(f"비디오 스트림을 찾을 수 없습니다: {video_path}")
+
+    stream = streams[0]
+    fps = 0.0
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        num, _, den = stream.get(key, '0/0').partition('/')
+        if den and float(den) > 0 and float(num) > 0:
+            fps = float(num) / float(den)
+            break
+    return {'width': int(stream['width']), 'height': int(stream['height']), 'fps': fps}
+
+
+def _scaled_size(width: int, height: int, max_width: Optional[int]):
+    """가로 max_width 이하로 비율 유지 축소 (YUV 변환을 위해 짝수로 맞춤)"""
+    if not max_width or width <= max_width:
+        return width - width % 2, height - height % 2
+    scaled_height = int(round(height * max_width / width / 2)) * 2
+    return max_width - max_width % 2, max(scaled_height, 2)
+
+
+def _read_exact(stream, size: int) -> bytes:
+    """파이프에서 정확히 size 바이트 읽기 (스트림 끝이면 빈 바이트)"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            return b''
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def iter_ffmpeg_key_frames(video_path: str, scene_threshold: float = 0.3,
+                           max_width: Optional[int] = 1280) -> Iterator[Dict]:
+    """FFmpeg가 장면 전환 프레임만 골라 축소한 BGR 프레임을 파이프로 받아 하나씩 yield
+
+    scene_threshold: select 필터의 scene 점수 기준 (0~1, 클수록 큰 변화만 선택)
+    max_width: 출력 프레임 최대 가로 크기 (None이면 원본 크기)
+    반환 형식은 OpenCV 경로와 동일: {'timestamp', 'frame', 'frame_number'}
+    """
+    info = probe_video_stream(video_path)
+    width, height = _scaled_size(info['width'], info['height'], max_width)
+    frame_size = width * height * 3
+
+    # 첫 프레임은 무조건 포함, 이후에는 scene 점수가 기준을 넘는 프레임만 선택
+    # showinfo는 select 직후에 두어 선택된 프레임의 pts_time을 stderr로 출력
+    video_filter = (
+        f"select='eq(n\\,0)+gt(scene\\,{scene_threshold})',"
+        f"showinfo,"
+        f"scale={width}:{height}"
+    )
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-i', video_path,
+        '-an',
+        '-vf', video_filter,
+        '-fps_mode', 'vfr',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'bgr24',
+        'pipe:1'
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    timestamps = queue.Queue()
+    # 실패 시 원인을 보여주기 위해 showinfo 외 stderr 마지막 줄들을 보관
+    stderr_tail = deque(maxlen=20)
+
+    def read_timestamps():
+        for raw_line in process.stderr:
+            line = raw_line.decode('utf-8', errors='ignore')
+            if 'showinfo' in line:
+                match = _PTS_TIME_PATTERN.search(line)
+                if match:
+                    timestamps.put(float(match.group(1)))
+            elif line.strip():
+                stderr_tail.append(line.rstrip())
+        timestamps.put(None)  # stderr 종료 표시
+
+    reader = threading.Thread(target=read_timestamps, daemon=True)
+    reader.start()
+
+    try:
+        while True:
+            buffer = _read_exact(process.stdout, frame_size)
+            if not buffer:
+                break
+            timestamp = timestamps.get()
+            if timestamp is None:
+                break
+
+            frame = np.frombuffer(buffer, dtype=np.uint8).reshape((height, width, 3))
+            frame_number = int(round(timestamp * info['fps'])) if info['fps'] > 0 else 0
+            yield {
+                'timestamp': timestamp,
+                'frame': frame,
+                'frame_number': frame_number
+            }
+
+        # 출력이 끝나면 종료 코드 확인 (디코딩/필터 오류로 끝난 경우 일부 프레임만 나온 것)
+        returncode = process.wait()
+        reader.join(timeout=5)
+        if returncode != 0:
+            details = "\n".join(stderr_tail)
+            raise RuntimeError(f"FFmpeg 핵심 프레임 추출 실패 (종료 코드 {returncode}): {video_path}\n{details}")
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        reader.join(timeout=1)
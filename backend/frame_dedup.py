@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+"""핵심 프레임 중복 판정: 지각 해시(dHash)로 후보를 찾고 썸네일 픽셀 비교로 확정"""
+
+
+def dhash(frame, hash_size: int = 16) -> int:
+    """프레임의 difference hash (hash_size² 비트 정수)
+
+    (hash_size+1) x hash_size grayscale로 축소한 뒤 가로로 이웃한 픽셀의 밝기 대소를 비트로 기록.
+    밝기/해상도/압축 차이에는 둔감하고 내용 변화에는 민감함.
+    같은 템플릿의 슬라이드처럼 본문 글자만 다른 프레임은 해시만으로 구분되지 않으므로 후보 검색에만 사용
+    """
+    small = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dedup_thumbnail(frame, size: Tuple[int, int] = (256, 144)) -> np.ndarray:
+    """픽셀 비교용 grayscale 썸네일 (글자 획이 남아 있을 정도의 크기)"""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+
+def changed_pixel_ratio(a: np.ndarray, b: np.ndarray, pixel_threshold: int = 32) -> float:
+    """두 썸네일에서 밝기가 pixel_threshold보다 많이 다른 픽셀 비율
+
+    화면 전체 밝기 변화(중앙값 차이)는 보정하므로 재인코딩/밝기 보정에는 둔감하고,
+    숫자 하나가 바뀐 것처럼 일부 영역만 달라진 경우에는 민감함
+    """
+    diff = a.astype(np.int16) - b.astype(np.int16)
+    diff = np.abs(diff - np.median(diff))
+    return float((diff > pixel_threshold).mean())
+
+
+class FrameHashIndex:
+    def __init__(self, max_distance: int = 24, max_changed_ratio: float = 0.0002, pixel_threshold: int = 32):
+        """
+        max_distance: 후보로 볼 최대 해밍 거리 (16x16 dHash 256비트 기준)
+        max_changed_ratio: 후보를 같은 프레임으로 확정할 최대 변경 픽셀 비율 (256x144 썸네일 기준 약 7픽셀)
+        pixel_threshold: 변경 픽셀로 볼 최소 밝기 차이 (0~255)
+        """
+        self.max_distance = max_distance
+        self.max_changed_ratio = max_changed_ratio
+        self.pixel_threshold = pixel_threshold
+        self.entries: List[Tuple[int, np.ndarray, Any]] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, frame_hash: int, thumbnail: np.ndarray) -> Optional[Any]:
+        """해시가 가까운 순으로 픽셀 비교를 통과한 첫 기존 프레임의 값 반환 (없으면 None)"""
+        candidates = []
+        for stored_hash, stored_thumbnail, value in self.entries:
+            distance = hamming_distance(stored_hash, frame_hash)
+            if distance <= self.max_distance:
+                candidates.append((distance, stored_thumbnail, value))
+        candidates.sort(key=lambda c: c[0])
+
+        for _, stored_thumbnail, value in candidates:
+            ratio = changed_pixel_ratio(stored_thumbnail, thumbnail, self.pixel_threshold)
+            if ratio <= self.max_changed_ratio:
+                return value
+        return None
+
+    def add(self, frame_hash: int, thumbnail: np.ndarray, value: Any):
+        self.entries.append((frame_hash, thumbnail, value))
@@ -0,0 +1,96 @@
+import cv2
+import math
+from typing import Dict, Iterator, Optional
+
+"""OpenCV 프레임 읽기: 샘플링 대상 프레임만 디코딩하는 스트리밍 이터레이터"""
+
+
+def probe_video(video_path: str) -> Dict:
+    """영상의 fps, 프레임 수, 길이(초) 조회"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+    duration = frame_count / fps if fps > 0 else 0.0
+    return {'fps': fps, 'frame_count': frame_count, 'duration': duration}
+
+
+def iter_video_frames(video_path: str, fps: float = 1, seek: bool = False,
+                      start: float = 0.0, end: Optional[float] = None) -> Iterator[Dict]:
+    """샘플링 대상 프레임만 디코딩하여 하나씩 yield
+
+    - 샘플 시점은 영상 전체 기준 격자(k / fps초)이므로 구간을 나눠 읽어도 결과가 같음
+    - 나머지 프레임은 grab()으로 건너뛰어 디코딩/색변환 비용을 줄임
+    - fps는 0.2처럼 1 미만도 가능 (5초에 1장)
+    - seek=True거나 컨테이너가 fps를 보고하지 않으면 타임스탬프 탐색 사용
+    - start/end: 읽을 구간 (초, end는 미포함)
+    """
+    if fps <= 0:
+        raise ValueError(f"fps는 0보다 커야 합니다: {fps}")
+
+    step = 1.0 / fps  # 샘플 간격 (초)
+    sample_index = math.ceil(start / step - 1e-9)
+    cap = cv2.VideoCapture(video_path)
+    try:
+        video_fps = cap.get(cv2.CAP_PROP_FPS)
+        if seek or not video_fps or video_fps <= 0:
+            yield from _iter_frames_by_seek(cap, step, sample_index, end)
+            return
+
+        frame_count = 0
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, math.floor(start * video_fps))
+            frame_count = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+        while end is None or sample_index * step < end:
+            if not cap.grab():
+                break
+            timestamp = frame_count / video_fps
+            # 부동소수 오차로 샘플이 한 프레임 밀리지 않도록 여유를 둠
+            if timestamp + 1e-6 >= sample_index * step:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield {
+                    'timestamp': timestamp,
+                    'frame': frame,
+                    'frame_number': frame_count
+                }
+                sample_index += 1
+            frame_count += 1
+    finally:
+        cap.release()
+
+
+def _iter_frames_by_seek(cap, step: float, sample_index: int = 0,
+                         end: Optional[float] = None) -> Iterator[Dict]:
+    """CAP_PROP_POS_MSEC 탐색으로 샘플 시점의 프레임만 읽기"""
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    last_position = -1.0
+
+    while end is None or sample_index * step < end:
+        timestamp = sample_index * step
+        cap.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        # 탐색이 지원되지 않아 같은 위치를 반복해서 읽는 경우 중단
+        position = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if position <= last_position:
+            break
+        last_position = position
+
+        if video_fps and video_fps > 0:
+            frame_number = int(round(timestamp * video_fps))
+        else:
+            frame_number = max(int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1, 0)
+
+        yield {
+            'timestamp': timestamp,
+            'frame': frame,
+            'frame_number': frame_number
+        }
+        sample_index += 1
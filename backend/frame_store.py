@@ -0,0 +1,88 @@
+import base64
+import mmap
+import os
+import struct
+import threading
+from typing import Optional
+
+"""영상 프레임 저장소: 컬렉션별 append-only 팩 파일 + 고정 길이 오프셋 인덱스 (mmap으로 읽기)"""
+
+
+class FramePackStore:
+    # 인덱스 레코드: 팩 파일 내 오프셋(8바이트) + 길이(4바이트)
+    RECORD = struct.Struct('<QI')
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        frame_dir = os.path.join(persist_directory, "frames")
+        os.makedirs(frame_dir, exist_ok=True)
+        self.pack_path = os.path.join(frame_dir, f"{collection_name}.pack")
+        self.index_path = os.path.join(frame_dir, f"{collection_name}.idx")
+
+        for path in (self.pack_path, self.index_path):
+            if not os.path.exists(path):
+                open(path, "ab").close()
+
+        self._lock = threading.Lock()
+        self._pack_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+
+    def __len__(self):
+        return os.path.getsize(self.index_path) // self.RECORD.size
+
+    def append(self, data: bytes) -> int:
+        """프레임 바이트를 팩 끝에 추가하고 참조 번호 반환"""
+        with self._lock:
+            # 팩 데이터를 먼저 기록해야 인덱스가 없는 데이터를 가리키지 않음
+            with open(self.pack_path, "ab") as pack:
+                offset = pack.seek(0, os.SEEK_END)
+                pack.write(data)
+            with open(self.index_path, "ab") as index:
+                ref = index.seek(0, os.SEEK_END) // self.RECORD.size
+                index.write(self.RECORD.pack(offset, len(data)))
+            return ref
+
+    def append_base64(self, frame_base64: str) -> int:
+        """base64 프레임을 원본 바이트로 저장 (base64보다 약 25% 작음)"""
+        return self.append(base64.b64decode(frame_base64))
+
+    def _remap(self):
+        """파일이 커졌으면 mmap을 다시 연결"""
+        for current in (self._pack_map, self._index_map):
+            if current is not None:
+                current.close()
+        self._pack_map = self._index_map = None
+
+        if os.path.getsize(self.index_path) == 0:
+            return
+        with open(self.pack_path, "rb") as pack:
+            self._pack_map = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.index_path, "rb") as index:
+            self._index_map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, ref: int) -> bytes:
+        """참조 번호로 프레임 바이트 조회"""
+        ref = int(ref)
+        if ref < 0:
+            raise KeyError(ref)
+
+        with self._lock:
+            record_end = (ref + 1) * self.RECORD.size
+            if self._index_map is None or len(self._index_map) < record_end:
+                self._remap()
+            if self._index_map is None or len(self._index_map) < record_end:
+                raise KeyError(ref)
+
+            offset, length = self.RECORD.unpack_from(self._index_map, ref * self.RECORD.size)
+            if self._pack_map is None or len(self._pack_map) < offset + length:
+                self._remap()
+            return self._pack_map[offset:offset + length]
+
+    def get_base64(self, ref: int) -> str:
+        return base64.b64encode(self.get(ref)).decode('utf-8')
+
+    def close(self):
+        with self._lock:
+            for current in (self._pack_map, self._index_map):
+                if current is not None:
+                    current.close()
+            self._pack_map = self._index_map = None
@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+"""영상 세그먼트 BM25 역색인: 저장 시 점진적으로 추가하고 Chroma 디렉토리 옆에 JSON으로 보관"""
+
+# 영문/숫자 단어(예: gpt-4o, 3.5, q3)와 한글 연속 구간
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[.\-][a-z0-9]+)*|[가-힣]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """검색용 토큰화
+
+    영문/숫자는 단어 단위(소문자), 한글은 형태소 분석기 없이 조사가 붙어도 맞도록 2글자 n-gram
+    (예: "삼성전자의" → 삼성, 성전, 전자, 자의)
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer((text or '').lower()):
+        token = match.group()
+        if '가' <= token[0] <= '힣':
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """path: 저장 위치 (JSON). None이면 메모리에만 유지"""
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _remove(self, doc_id: str):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc['length']
+        for term in doc['tf']:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def _insert(self, doc_id: str, tf: Dict[str, int], length: int, metadata: Dict):
+        self.docs[doc_id] = {'tf': tf, 'length': length, 'metadata': metadata}
+        self.total_length += length
+        for term, count in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict] = None):
+        """문서 추가 (같은 ID가 있으면 교체)
+
+        metadata: 검색 시 필터에 쓸 값 (timestamp, video_id)
+        """
+        tokens = tokenize(text)
+        with self._lock:
+            self._remove(doc_id)
+            self._insert(doc_id, dict(Counter(tokens)), len(tokens), metadata or {})
+
+    def search(self, query: str, k: int = 10, time_range: Optional[Tuple[float, float]] = None,
+               video_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """BM25 점수 상위 k개 [(doc_id, score), ...]"""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not self.docs or not terms:
+                return []
+
+            n_docs = len(self.docs)
+            avg_length = self.total_length / n_docs or 1.0
+            scores: Dict[str, float] = {}
+
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    length = self.docs[doc_id]['length']
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+
+            results = []
+            for doc_id, score in scores.items():
+                metadata = self.docs[doc_id]['metadata']
+                if video_id is not None and metadata.get('video_id') != video_id:
+                    continue
+                if time_range is not None:
+                    start, end = time_range
+                    timestamp = metadata.get('timestamp', 0)
+                    if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                        continue
+                results.append((doc_id, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k]
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock:
+            payload = {'docs': self.docs}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        with self._lock:
+            self.docs, self.postings, self.total_length = {}, {}, 0
+            for doc_id, doc in payload.get('docs', {}).items():
+                self._insert(doc_id, doc['tf'], doc['length'], doc.get('metadata', {}))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """여러 순위 리스트를 RRF로 결합: score = Σ 1 / (k + 순위)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import openai
+
+"""LLM 호출 동시성 도구: 분당 요청/토큰 수 제한, 지수 백오프 재시도, 순서 보존 병렬 실행"""
+
+# 재시도하면 성공할 수 있는 일시적 오류
+TRANSIENT_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class RateLimiter:
+    """최근 60초 동안의 요청 수와 토큰 수를 세어 분당 한도를 넘지 않도록 대기 (스레드 안전)
+
+    tokens_per_minute: 분당 토큰 한도 (acquire에 넘긴 예상 토큰 수로 계산). 한도보다 큰 요청 하나는
+    최근 60초 동안 다른 요청이 없을 때 단독으로 허용
+    """
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = deque()  # (시각, 토큰 수)
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._requests and now - self._requests[0][0] >= 60:
+                    self._tokens -= self._requests.popleft()[1]
+
+                requests_ok = not self.requests_per_minute or len(self._requests) < self.requests_per_minute
+                tokens_ok = (not self.tokens_per_minute or not self._requests
+                             or self._tokens + tokens <= self.tokens_per_minute)
+                if requests_ok and tokens_ok:
+                    self._requests.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = 60 - (now - self._requests[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+def call_with_retry(fn: Callable, *args, max_retries: int = 3, base_delay: float = 1.0,
+                    max_delay: float = 30.0, retry_on=TRANSIENT_ERRORS, **kwargs):
+    """일시적 오류면 지수 백오프(+지터)로 재시도, 그 외 오류나 재시도 소진 시 예외 전파"""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            print(f"  ⚠️ 일시적 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{max_retries}): {e}")
+            time.sleep(delay)
+
+
+def map_concurrent(fn: Callable, items: Sequence, max_workers: int = 4,
+                   rate_limiter: Optional[RateLimiter] = None, max_retries: int = 3,
+                   on_done: Optional[Callable[[int, int], None]] = None,
+                   cost: Optional[Callable[[Any], int]] = None) -> Tuple[List[Any], Dict[int, Exception]]:
+    """items 각각에 fn을 동시에 최대 max_workers개씩 적용
+
+    반환: (입력 순서대로의 결과 리스트, 실패한 인덱스 → 예외)
+    실패한 항목의 결과는 None
+    on_done(완료 개수, 전체 개수): 항목 하나가 끝날 때마다 호출 (진행 표시용)
+    cost(item): 항목의 예상 토큰 수 (rate_limiter의 분당 토큰 한도 계산용)
+    """
+    results: List[Any] = [None] * len(items)
+    errors: Dict[int, Exception] = {}
+
+    def run(item):
+        def attempt():
+            # 재시도도 요청 한도에 포함
+            if rate_limiter is not None:
+                rate_limiter.acquire(cost(item) if cost is not None else 0)
+            return fn(item)
+        return call_with_retry(attempt, max_retries=max_retries)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(run, item): i for i, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                errors[i] = e
+            if on_done is not None:
+                on_done(done, len(items))
+
+    return results, errors
@@ -0,0 +1,123 @@
+import fitz
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+from sharded_partition import partition_ranges_parallel
+
+"""PDF 페이지별 파싱 전략 선택: PyMuPDF로 페이지를 가볍게 분류하고 필요한 페이지만 hi_res/OCR로 파싱"""
+
+# 페이지 종류별 partition_pdf 옵션
+PAGE_STRATEGIES = {
+    # 텍스트 레이어만 있는 페이지: 레이아웃 모델 없이 텍스트 레이어 직접 사용
+    "text": {
+        "strategy": "fast",
+    },
+    # 이미지가 있는 페이지: 이미지 블록 추출을 위해 hi_res, 표 구조 추론은 생략
+    "image": {
+        "strategy": "hi_res",
+        "extract_images_in_pdf": True,
+        "extract_image_block_types": ["Image"],
+        "extract_image_block_to_payload": False,
+        "infer_table_structure": False,
+    },
+    # 표가 있을 가능성이 높은 페이지: hi_res + 표 구조 추론
+    "table": {
+        "strategy": "hi_res",
+        "extract_images_in_pdf": True,
+        "extract_image_block_types": ["Image"],
+        "extract_image_block_to_payload": False,
+        "infer_table_structure": True,
+    },
+    # 텍스트 레이어가 없는 스캔 페이지: OCR
+    "scanned": {
+        "strategy": "ocr_only",
+    },
+}
+
+
+def classify_page(page, min_text_chars: int = 50, scan_coverage: float = 0.5,
+                  min_image_points: float = 48.0, table_rulings: int = 8) -> str:
+    """페이지 종류 판별: "scanned" > "table" > "image" > "text" 순으로 우선
+
+    scanned: 텍스트가 거의 없고 이미지가 페이지 대부분을 덮음
+    table: 가로/세로 괘선이 table_rulings개 이상 (선으로 그린 표)
+    image: 한 변이 min_image_points(pt) 이상인 이미지가 있음 (아이콘/장식 제외)
+    """
+    page_rect = page.rect
+    page_area = page_rect.get_area() or 1.0
+    text_chars = len("".join(page.get_text("text").split()))
+
+    image_area = 0.0
+    has_image = False
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if bbox.is_empty:
+            continue
+        image_area += bbox.get_area()
+        if min(bbox.width, bbox.height) >= min_image_points:
+            has_image = True
+
+    if text_chars < min_text_chars and image_area / page_area >= scan_coverage:
+        return "scanned"
+
+    rulings = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                start, end = item[1], item[2]
+                # 수평선/수직선만 표 괘선으로 취급
+                if abs(start.x - end.x) < 1 or abs(start.y - end.y) < 1:
+                    rulings += 1
+            elif item[0] == "re":
+                # 셀 테두리로 그린 사각형
+                rulings += 2
+        if rulings >= table_rulings:
+            return "table"
+
+    return "image" if has_image else "text"
+
+
+def classify_pages(filename: str) -> List[str]:
+    """모든 페이지의 종류 리스트 (페이지 순서)"""
+    with fitz.open(filename) as doc:
+        return [classify_page(page) for page in doc]
+
+
+def plan_routed_ranges(categories: List[str], max_pages: int) -> List[Tuple[int, int, str]]:
+    """같은 종류가 연속된 페이지를 묶어 [(first, last, 종류), ...] 구간 생성 (0부터 시작, last 포함)
+
+    병렬 처리를 위해 한 구간은 최대 max_pages페이지
+    """
+    ranges = []
+    first = 0
+    for i in range(1, len(categories) + 1):
+        if i == len(categories) or categories[i] != categories[first] or i - first >= max_pages:
+            ranges.append((first, i - 1, categories[first]))
+            first = i
+    return ranges
+
+
+def partition_pdf_routed(filename: str, figure_path: str, max_workers: int = None,
+                         ranges_per_worker: int = 2) -> Tuple[list, List[str], Dict[str, int]]:
+    """페이지 종류에 맞는 전략으로 구간별 병렬 파싱 후 페이지 순서로 병합
+
+    반환: (요소 리스트, 저장된 이미지 경로 리스트, 종류별 페이지 수)
+    청크 구성은 하지 않음 (병합 후 호출하는 쪽에서 chunk_by_title 적용)
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    categories = classify_pages(filename)
+    page_counts = dict(Counter(categories))
+    print(f"  → 페이지 분류: {page_counts}")
+    if not categories:
+        return [], [], page_counts
+
+    max_pages = max(1, math.ceil(len(categories) / (max_workers * ranges_per_worker)))
+    ranges = [
+        (first, last, PAGE_STRATEGIES[category])
+        for first, last, category in plan_routed_ranges(categories, max_pages)
+    ]
+    print(f"  → {len(categories)}페이지를 {len(ranges)}개 구간으로 파싱 (워커 {max_workers}개)")
+
+    elements, image_paths = partition_ranges_parallel(filename, ranges, figure_path, max_workers=max_workers)
+    return elements, image_paths, page_counts
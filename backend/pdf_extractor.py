@@ -1,44 +1,95 @@
+import codecs
 import os
-import shutil
+import tempfile
+from functools import lru_cache
 from unstructured.partition.pdf import partition_pdf
+from unstructured.chunking.title import chunk_by_title
+from pymupdf_extractor import partition_pdf_pymupdf
+from sharded_partition import partition_pdf_sharded
+from page_router import partition_pdf_routed
+from utils import get_encoder, list_images
+from langchain_core.documents import Document
 from langchain_text_splitters import CharacterTextSplitter
 
 # 전역 retriever 저장소
 _retrievers = {}
 
-def extract_pdf_elements(path, fname, conv_id):
-    # 모든 이미지를 ./figures 폴더에 저장
-    figure_path = os.path.abspath("./figures")
-    os.makedirs(figure_path, exist_ok=True)
-    print(f"📍 이미지 저장 경로: {figure_path}")
+PDF_ENGINES = ("unstructured", "pymupdf", "routed")
+
+# by_title 청크 기준 (엔진과 관계없이 동일)
+CHUNKING_PARAMS = {
+    "max_characters": 4000,
+    "new_after_n_chars": 3800,
+    "combine_text_under_n_chars": 2000,
+}
+
+# unstructured 파싱 옵션 (청크 구성과 이미지 저장 경로는 호출하는 쪽에서 지정)
+PARTITION_PARAMS = {
+    "extract_images_in_pdf": True,
+    "infer_table_structure": True,
+    "extract_image_block_types": ["Image"],
+    "extract_image_block_to_payload": False,
+}
+
+
+def make_figure_dir(fname, conv_id, root="./figures"):
+    """문서별 이미지 폴더 생성: ./figures/<conv_id>/<문서명>_<임의값>
+
+    다른 대화/문서의 이미지와 섞이지 않고, 같은 문서를 동시에 올려도 폴더가 겹치지 않음
+    """
+    conv_dir = os.path.abspath(os.path.join(root, conv_id))
+    os.makedirs(conv_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(fname))[0]
+    return tempfile.mkdtemp(prefix=f"{stem}_", dir=conv_dir)
+
+
+def extract_pdf_elements(path, fname, conv_id, engine="unstructured", page_workers=1):
+    """PDF 파싱
+
+    engine: "unstructured" (레이아웃 모델, 정확하지만 느림), "pymupdf" (텍스트 레이어 직접 추출, 빠름),
+            "routed" (페이지별로 분류해 필요한 페이지만 hi_res/OCR, 나머지는 텍스트 레이어)
+    page_workers: unstructured/routed 엔진에서 페이지 구간을 나눠 병렬 파싱할 프로세스 수 (1이면 한 프로세스)
+    반환: (raw_elements, figure_path, image_paths)
+    figure_path는 이 문서 전용 폴더라 image_paths는 이 문서에서 추출한 이미지만 포함
+    """
+    if engine not in PDF_ENGINES:
+        raise ValueError(f"지원하지 않는 PDF 엔진: {engine} (가능: {', '.join(PDF_ENGINES)})")
+
+    figure_path = make_figure_dir(fname, conv_id)
+    print(f"📍 이미지 저장 경로: {figure_path} (엔진: {engine})")
+    filename = os.path.join(path, fname)
+
+    if engine == "pymupdf":
+        elements, image_paths = partition_pdf_pymupdf(filename, figure_path)
+        # unstructured 경로와 같은 기준으로 청크 구성
+        raw_elements = chunk_by_title(elements, **CHUNKING_PARAMS)
+        return raw_elements, figure_path, image_paths
+
+    if engine == "routed":
+        elements, image_paths, _ = partition_pdf_routed(filename, figure_path, max_workers=page_workers)
+        raw_elements = chunk_by_title(elements, **CHUNKING_PARAMS)
+        return raw_elements, figure_path, image_paths
+
+    if page_workers > 1:
+        elements, image_paths = partition_pdf_sharded(
+            filename, figure_path, PARTITION_PARAMS, max_workers=page_workers
+        )
+        # 페이지 순서로 병합한 뒤 청크를 구성해야 구간 경계에서 청크가 잘리지 않음
+        raw_elements = chunk_by_title(elements, **CHUNKING_PARAMS)
+        return raw_elements, figure_path, image_paths
 
     raw_elements = partition_pdf(
-        filename=os.path.join(path, fname),
-        extract_images_in_pdf=True,
-        infer_table_structure=True,
+        filename=filename,
         chunking_strategy="by_title",
-        max_characters=4000,
-        new_after_n_chars=3800,
-        combine_text_under_n_chars=2000,
         image_output_dir_path=figure_path,
-        extract_image_block_types=["Image"],
-        extract_image_block_to_payload=False,
+        **PARTITION_PARAMS,
+        **CHUNKING_PARAMS,
     )
-    # 추출된 이미지 파일 이름에 conv_id 붙이기
-    image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-    for f in os.listdir(figure_path):
-        if f.lower().endswith(image_extensions):
-            old_path = os.path.join(figure_path, f)
-            new_name = f"{conv_id}_{f}"
-            new_path = os.path.join(figure_path, new_name)
-            # 이름이 이미 conv_id로 시작하지 않으면 변경
-            if not f.startswith(f"{conv_id}_"):
-                shutil.move(old_path, new_path)
-                print(f"  → 이미지 이름 변경: {f} → {new_name}")
-
-    return raw_elements, figure_path
-
-def categorize_elements(raw_elements, figure_path=None):
+    image_paths = list_images(figure_path)
+
+    return raw_elements, figure_path, image_paths
+
+def categorize_elements(raw_elements, image_paths=None):
     """요소를 텍스트, 테이블, 이미지로 분류"""
     texts, tables = [], []
         
@@ -49,24 +100,93 @@ def categorize_elements(raw_elements, figure_path=None):
             tables.append(str(el))
         elif "CompositeElement" in el_type:
             texts.append(str(el))
-    # 이미지는 파일 시스템에서 직접 확인
-    image_count = 0
-    if figure_path and os.path.exists(figure_path):
-        image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-        image_files = [
-            f for f in os.listdir(figure_path) 
-            if f.lower().endswith(image_extensions)
-        ]
-        image_count = len(image_files)
-        print(f"📸 {figure_path}에서 {image_count}개 이미지 발견")
+    # 이미지는 extract_pdf_elements가 돌려준 목록으로 확인
+    image_count = len(image_paths or [])
+    print(f"📸 이미지 {image_count}개")
     
     return texts, tables, image_count
 
 
-def split_texts(texts, chunk_size=4000):
-    splitter = CharacterTextSplitter.from_tiktoken_encoder(
+@lru_cache(maxsize=None)
+def _get_splitter(chunk_size):
+    return CharacterTextSplitter.from_tiktoken_encoder(
         chunk_size=chunk_size, 
         chunk_overlap=0
     )
+
+
+def split_texts(texts, chunk_size=4000):
+    """문자열 리스트를 이어붙여 토큰 기준으로 분할 (요소 메타데이터가 필요하면 pack_text_elements 사용)"""
+    splitter = _get_splitter(chunk_size)
     joined_texts = " ".join(texts)
-    return splitter.split_text(joined_texts)
\ No newline at end of file
+    return splitter.split_text(joined_texts)
+
+
+def _split_tokens(encoder, tokens, chunk_size):
+    """너무 긴 요소를 chunk_size 토큰 단위로 자르기
+
+    토큰 경계가 한글 글자(UTF-8 여러 바이트) 중간일 수 있으므로 증분 디코더로 다음 조각에 이어 붙임
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for start in range(0, len(tokens), chunk_size):
+        window = tokens[start:start + chunk_size]
+        final = start + chunk_size >= len(tokens)
+        yield decoder.decode(encoder.decode_bytes(window), final=final), len(window)
+
+
+def pack_text_elements(elements, chunk_size=4000, separator="\n\n", encoding_name="cl100k_base"):
+    """텍스트 요소(CompositeElement)를 순서대로 chunk_size 토큰 이하의 청크로 묶기 (제너레이터)
+
+    요소는 한 번만 토큰화하고 통째로 묶음. chunk_size보다 긴 요소만 잘라서 단독 청크로 만듦
+    각 청크는 Document이며 metadata에 출처 페이지 범위와 요소 ID, 토큰 수를 포함
+    """
+    encoder = get_encoder(encoding_name)
+    separator_tokens = len(encoder.encode(separator))
+
+    parts, pages, element_ids = [], [], []
+    token_count = 0
+    chunk_index = 0
+
+    def make_chunk(text, chunk_pages, chunk_ids, tokens):
+        metadata = {
+            "chunk_index": chunk_index,
+            "token_count": tokens,
+            "page_start": min(chunk_pages) if chunk_pages else None,
+            "page_end": max(chunk_pages) if chunk_pages else None,
+            "element_ids": ",".join(chunk_ids),
+        }
+        return Document(page_content=text, metadata=metadata)
+
+    for el in elements:
+        if "CompositeElement" not in str(type(el)):
+            continue
+        text = str(el).strip()
+        if not text:
+            continue
+
+        page = getattr(el.metadata, "page_number", None)
+        el_pages = [page] if page is not None else []
+        el_ids = [el.id] if getattr(el, "id", None) else []
+        tokens = encoder.encode(text)
+
+        # 현재 청크에 넣으면 한도를 넘으면 먼저 내보냄
+        added = len(tokens) + (separator_tokens if parts else 0)
+        if parts and token_count + added > chunk_size:
+            yield make_chunk(separator.join(parts), pages, element_ids, token_count)
+            chunk_index += 1
+            parts, pages, element_ids, token_count = [], [], [], 0
+            added = len(tokens)
+
+        if len(tokens) > chunk_size:
+            for piece, piece_tokens in _split_tokens(encoder, tokens, chunk_size):
+                yield make_chunk(piece, el_pages, el_ids, piece_tokens)
+                chunk_index += 1
+            continue
+
+        parts.append(text)
+        pages.extend(el_pages)
+        element_ids.extend(el_ids)
+        token_count += added
+
+    if parts:
+        yield make_chunk(separator.join(parts), pages, element_ids, token_count)
@@ -0,0 +1,22 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+"""CPU 작업용 프로세스 풀: spawn 컨텍스트에서 작업을 병렬 실행하고 입력 순서대로 결과 반환"""
+
+
+def map_ordered_in_processes(fn: Callable, args_list: Sequence[Tuple], max_workers: int,
+                             initializer: Optional[Callable] = None) -> List[Any]:
+    """args_list의 인자 튜플마다 fn(*args)를 프로세스 풀에서 실행하고 입력 순서대로 결과 반환
+
+    서버 스레드와 함께 fork하면 락이 복제되어 멈출 수 있으므로 spawn 사용.
+    fn/initializer는 모듈 최상위 함수여야 함 (워커에서 import로 찾음)
+    initializer: 워커 시작 시 한 번 실행. 프로세스 수만큼 병렬화하므로
+                 OpenCV/torch 같은 라이브러리 내부 스레드를 1개로 줄이는 데 사용
+    작업 하나라도 실패하면 그 예외를 그대로 전파
+    """
+    context = multiprocessing.get_context("spawn")
+    workers = max(1, min(max_workers, len(args_list)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer) as executor:
+        futures = [executor.submit(fn, *args) for args in args_list]
+        return [future.result() for future in futures]
@@ -0,0 +1,98 @@
+import os
+import fitz
+from typing import List, Tuple
+from unstructured.documents.elements import ElementMetadata, NarrativeText, Table
+
+"""PyMuPDF 기반 PDF 파싱: 레이아웃 모델 없이 텍스트 블록/표/내장 이미지를 바로 추출 (unstructured 요소 형식으로 반환)"""
+
+
+def _table_text(table) -> str:
+    """PyMuPDF 표를 행 단위 텍스트로 변환 (셀은 ' | '로 구분)"""
+    rows = []
+    for row in table.extract():
+        cells = [" ".join(str(cell).split()) if cell is not None else "" for cell in row]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+
+def _inside_any(rect: fitz.Rect, regions: List[fitz.Rect]) -> bool:
+    """텍스트 블록이 표 영역 안에 있는지 (표 내용이 본문에 중복되지 않도록)"""
+    for region in regions:
+        overlap = rect & region
+        if not overlap.is_empty and overlap.get_area() >= 0.5 * rect.get_area():
+            return True
+    return False
+
+
+def _page_elements(page, page_number: int, filename: str, find_tables: bool):
+    tables, table_regions = [], []
+    if find_tables:
+        try:
+            for table in page.find_tables().tables:
+                text = _table_text(table)
+                if text:
+                    tables.append(Table(text=text, metadata=ElementMetadata(page_number=page_number, filename=filename)))
+                    table_regions.append(fitz.Rect(table.bbox))
+        except Exception as e:
+            print(f"  ⚠️ {page_number}페이지 표 인식 실패: {e}")
+
+    elements = []
+    # 블록: (x0, y0, x1, y1, 텍스트, 블록 번호, 종류) - 종류 0이 텍스트, 읽는 순서로 정렬
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks", sort=True):
+        text = " ".join(text.split())
+        if block_type != 0 or not text:
+            continue
+        if table_regions and _inside_any(fitz.Rect(x0, y0, x1, y1), table_regions):
+            continue
+        elements.append(NarrativeText(text=text, metadata=ElementMetadata(page_number=page_number, filename=filename)))
+
+    return elements + tables
+
+
+def _save_page_images(doc, page, page_number: int, image_output_dir: str, seen_xrefs: set,
+                      min_image_size: int) -> List[str]:
+    """페이지의 내장 이미지를 figure-<페이지>-<번호>.<확장자>로 저장 (unstructured와 같은 이름 규칙)"""
+    paths = []
+    for xref, *_ in page.get_images(full=True):
+        # 여러 페이지에 반복되는 로고 등은 한 번만 저장
+        if xref in seen_xrefs:
+            continue
+        seen_xrefs.add(xref)
+
+        try:
+            image = doc.extract_image(xref)
+        except Exception as e:
+            print(f"  ⚠️ {page_number}페이지 이미지 추출 실패 (xref {xref}): {e}")
+            continue
+        # 아이콘/장식선 같은 작은 이미지는 제외
+        if not image or min(image["width"], image["height"]) < min_image_size:
+            continue
+
+        path = os.path.join(image_output_dir, f"figure-{page_number}-{len(paths) + 1}.{image['ext']}")
+        with open(path, "wb") as f:
+            f.write(image["image"])
+        paths.append(path)
+    return paths
+
+
+def partition_pdf_pymupdf(filename: str, image_output_dir: str, find_tables: bool = True,
+                          min_image_size: int = 64) -> Tuple[list, List[str]]:
+    """PDF를 페이지 순서대로 파싱
+
+    반환: (요소 리스트, 저장한 이미지 경로 리스트)
+    요소는 unstructured의 NarrativeText/Table이라 chunk_by_title과 categorize_elements를 그대로 사용 가능
+    """
+    os.makedirs(image_output_dir, exist_ok=True)
+    name = os.path.basename(filename)
+
+    elements, image_paths = [], []
+    seen_xrefs = set()
+    with fitz.open(filename) as doc:
+        for index, page in enumerate(doc):
+            page_number = index + 1
+            elements.extend(_page_elements(page, page_number, name, find_tables))
+            image_paths.extend(_save_page_images(doc, page, page_number, image_output_dir,
+                                                 seen_xrefs, min_image_size))
+
+    return elements, image_paths
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+from collections import deque
+from typing import Dict, Iterable, Iterator
+
+"""스트리밍 장면 전환 감지: 축소 grayscale 썸네일 + 적응형 임계값"""
+class SceneChangeDetector:
+    def __init__(self, threshold: float = 25.0, thumb_size=(64, 36),
+                 window: int = 30, sensitivity: float = 3.0, min_history: int = 5):
+        """
+        threshold: 최소 임계값 (썸네일 평균 절대 차이, 0~255)
+        thumb_size: 비교에 사용할 썸네일 크기 (width, height)
+        window: 적응형 임계값 계산에 사용할 최근 차이값 개수
+        sensitivity: 임계값 = 평균 + sensitivity * 표준편차
+        min_history: 적응형 임계값을 쓰기 전에 필요한 최소 차이값 개수
+        """
+        self.threshold = threshold
+        self.thumb_size = thumb_size
+        self.sensitivity = sensitivity
+        self.min_history = min_history
+        self.history = deque(maxlen=window)
+        self.prev_thumb = None
+
+    def reset(self):
+        self.history.clear()
+        self.prev_thumb = None
+
+    def thumbnail(self, frame) -> np.ndarray:
+        """프레임을 작은 grayscale 썸네일로 변환 (축소 후 변환하여 연산량 최소화)"""
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def current_threshold(self) -> float:
+        """최근 차이값 통계 기반 임계값 (기록이 부족하면 기본 임계값)"""
+        if len(self.history) < self.min_history:
+            return self.threshold
+        scores = np.fromiter(self.history, dtype=np.float32)
+        adaptive = float(scores.mean() + self.sensitivity * scores.std())
+        return max(self.threshold, adaptive)
+
+    def update(self, frame) -> bool:
+        """프레임 하나를 처리하고 장면 전환(핵심 프레임) 여부 반환
+
+        첫 프레임은 무조건 핵심 프레임으로 취급
+        """
+        thumb = self.thumbnail(frame)
+        prev_thumb = self.prev_thumb
+        self.prev_thumb = thumb
+
+        if prev_thumb is None:
+            return True
+
+        diff_score = float(cv2.absdiff(prev_thumb, thumb).mean())
+        is_scene_change = diff_score > self.current_threshold()
+
+        # 장면 전환 자체는 통계에서 제외하여 임계값이 튀지 않도록 함
+        if not is_scene_change:
+            self.history.append(diff_score)
+        return is_scene_change
+
+    def detect(self, frames: Iterable[Dict]) -> Iterator[Dict]:
+        """프레임 이터레이터를 소비하며 핵심 프레임을 발견 즉시 yield"""
+        for frame_data in frames:
+            if self.update(frame_data['frame']):
+                yield frame_data
@@ -7,38 +7,118 @@ if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
 from video_processor import VideoProcessor
-from video_embedding import VideoEmbedder
-from video_vectorStore import VideoVectorStore
-from pdf_extractor import extract_pdf_elements, categorize_elements, split_texts
-from summarizer import summarize_texts
-from clip_embedding import generate_clip_embeddings
+from video_embedding import VideoEmbedder, FrameEncodingPolicy
+from video_vectorStore import get_video_store
+from video_cache import VideoArtifactCache, file_digest
+from pdf_extractor import extract_pdf_elements, categorize_elements, pack_text_elements
+from summarizer import summarize_texts, encode_image
+from clip_embedding import summarize_image_files
 from vector_manager import create_vectorstore, create_multi_vector_retriever
 
 # 전역 retriever 저장소
 _retrievers = {}
 
+# PDF 파싱 엔진: "unstructured" (기본, 레이아웃 모델), "pymupdf" (빠른 텍스트 레이어 추출),
+# "routed" (페이지별로 필요한 페이지만 hi_res/OCR)
+PDF_ENGINE = os.getenv("PDF_ENGINE", "unstructured")
+
+# 큰 PDF를 페이지 구간별로 병렬 파싱할 프로세스 수 (기본 1: 사용 안 함)
+# 워커마다 레이아웃 모델을 따로 올리므로 메모리를 보고 작게 지정
+PDF_PAGE_WORKERS = max(1, int(os.getenv("PDF_PAGE_WORKERS", "1")))
+
+# 영상 처리 결과 캐시 (대화 간 공유)
+_video_cache = VideoArtifactCache()
+
+# 영상 처리 결과에 영향을 주는 파라미터 (VideoProcessor/VideoEmbedder에 그대로 전달, 바뀌면 캐시 키도 바뀜)
+VIDEO_PROCESSING_PARAMS = {
+    "version": 3,
+    "fps": 1,
+    "scene_threshold": 25.0,
+    "ffmpeg_scene_threshold": 0.3,
+    "frame_engine": "opencv",
+    "vision_model": "gpt-4o-mini",
+    "dedup": True,
+    "dedup_distance": 24,
+    "dedup_changed_ratio": 0.0002,
+    "vision_batch_size": 1,
+    "audio_span": True,
+    "max_audio_seconds": 60.0,
+    "transcription_model": "whisper-1",
+    "chunking": {
+        "max_chunk_seconds": 600,
+        "codec": "libopus",
+        "bitrate": "32k",
+        "extension": ".ogg",
+        "silence_db": -35,
+        "min_silence": 0.5,
+        "min_tail_seconds": 1.0,
+    },
+    "frame_encoding": FrameEncodingPolicy().to_dict(),
+}
+
 def process_video(video_path: str, conv_id: str):
     """영상 처리 및 벡터 DB 저장"""
     
     print(f"📹 영상 처리 시작: {video_path}")
     
-    # 1. 영상 처리
-    processor = VideoProcessor()
-    key_frames, text_segments = processor.process_video(video_path)
-    
-    # 2. 임베딩 생성
-    embedder = VideoEmbedder()
-    embeddings = embedder.create_embeddings(key_frames, text_segments)
+    # 같은 대화에 영상이 여러 개여도 문서 ID가 겹치지 않도록 내용 해시로 영상 ID 생성
+    content_digest = file_digest(video_path)
+    video_id = f"{conv_id}_{content_digest[:16]}"
+    
+    cache_key = _video_cache.make_key(video_path, VIDEO_PROCESSING_PARAMS, content_digest=content_digest)
+    cached = _video_cache.get(cache_key)
+    
+    if cached is not None:
+        # 내용이 같은 영상은 FFmpeg/디코딩/STT/프레임 분석을 건너뛰고 바로 저장
+        print(f"  → 캐시 적중: 처리 결과 재사용 ({cache_key[:12]})")
+        embeddings = cached['embeddings']
+    else:
+        # 1. 영상 처리
+        processor = VideoProcessor(
+            frame_engine=VIDEO_PROCESSING_PARAMS["frame_engine"],
+            fps=VIDEO_PROCESSING_PARAMS["fps"],
+            scene_threshold=VIDEO_PROCESSING_PARAMS["scene_threshold"],
+            ffmpeg_scene_threshold=VIDEO_PROCESSING_PARAMS["ffmpeg_scene_threshold"],
+            transcription_model=VIDEO_PROCESSING_PARAMS["transcription_model"],
+            chunking=VIDEO_PROCESSING_PARAMS["chunking"]
+        )
+        key_frames, text_segments = processor.process_video(video_path)
+        
+        # 2. 임베딩 생성
+        embedder = VideoEmbedder(
+            model=VIDEO_PROCESSING_PARAMS["vision_model"],
+            dedup_distance=VIDEO_PROCESSING_PARAMS["dedup_distance"],
+            dedup_changed_ratio=VIDEO_PROCESSING_PARAMS["dedup_changed_ratio"],
+            batch_size=VIDEO_PROCESSING_PARAMS["vision_batch_size"],
+            encoding=FrameEncodingPolicy(**VIDEO_PROCESSING_PARAMS["frame_encoding"])
+        )
+        embeddings = embedder.create_embeddings(
+            key_frames, text_segments,
+            dedup=VIDEO_PROCESSING_PARAMS["dedup"],
+            audio_span=VIDEO_PROCESSING_PARAMS["audio_span"],
+            max_audio_seconds=VIDEO_PROCESSING_PARAMS["max_audio_seconds"]
+        )
+        
+        # 프레임 분석이 일부 실패한 결과는 캐시하지 않음 (다음 처리 때 다시 분석하도록)
+        if embedder.stats.get('failures'):
+            print(f"  → 프레임 분석 실패 {len(embedder.stats['failures'])}개가 있어 처리 결과를 캐시하지 않음")
+        else:
+            _video_cache.put(cache_key, {
+                "key_frames": key_frames,
+                "text_segments": text_segments,
+                "embeddings": embeddings,
+            })
     
     # 3. 벡터 DB 저장 (conversation별로 collection 생성)
     collection_name = f"video_conv_{conv_id}"
-    vector_store = VideoVectorStore(collection_name=collection_name)
-    vector_store.store_video_embeddings(conv_id, embeddings)
+    vector_store = get_video_store(collection_name=collection_name)
+    report = vector_store.store_video_embeddings(video_id, embeddings)
     
-    print(f"✅ 영상 처리 완료: {len(embeddings)}개 세그먼트 저장")
+    print(f"✅ 영상 처리 완료: {report['stored']}/{len(embeddings)}개 세그먼트 저장")
     
     return {
-        "segments_count": len(embeddings),
+        "segments_count": report['stored'],
+        "failed_batches": len(report['failed']),
         "collection_name": collection_name
     }
 
@@ -53,24 +133,32 @@ def process_document(pdf_path: str, conv_id: str):
     
     # 1. PDF 추출
     print("  → PDF 파싱 중...")
-    raw_elements, figure_path = extract_pdf_elements(fpath, fname, conv_id)
-    texts, tables, image_count = categorize_elements(raw_elements, figure_path)
+    raw_elements, figure_path, image_paths = extract_pdf_elements(
+        fpath, fname, conv_id, engine=PDF_ENGINE, page_workers=PDF_PAGE_WORKERS
+    )
+    texts, tables, image_count = categorize_elements(raw_elements, image_paths)
     print(f"  → 추출 완료: {len(texts)} 텍스트, {len(tables)} 테이블, {image_count} 이미지")
     
-    # 2. 텍스트 분할
-    texts_4k_token = split_texts(texts)
+    # 2. 텍스트 분할 (요소 단위로 4k 토큰 이하 청크 구성, 출처 페이지 메타데이터 유지)
+    text_chunks = list(pack_text_elements(raw_elements))
+    texts_4k_token = [chunk.page_content for chunk in text_chunks]
     
     # 3. 요약 생성
     print("  → 요약 생성 중...")
     text_summaries, table_summaries = summarize_texts(
         texts_4k_token, 
         tables, 
-        summarize_texts_flag=True
+        summarize_texts_flag=True,
+        max_concurrency=8,
+        table_batch_size=4
     )
     
     # 4. 이미지 처리
-    print(f"  → 이미지 폴더 확인: {figure_path}")
-    images_base64, image_summaries = generate_clip_embeddings(figure_path)
+    print(f"  → 이미지 처리 중: {len(image_paths)}개 ({figure_path})")
+    # 검색은 요약 텍스트 임베딩으로 하므로 CLIP 벡터는 만들지 않음
+    image_summaries, image_paths = summarize_image_files(image_paths)
+    # docstore에는 원본 이미지(base64)를 저장 (rag_service에서 그대로 LLM에 전달)
+    images_base64 = [encode_image(p) for p in image_paths]
     
     # 5. 벡터 저장소 생성
     print("  → 벡터 DB 생성 중...")
@@ -80,11 +168,12 @@ def process_document(pdf_path: str, conv_id: str):
     retriever = create_multi_vector_retriever(
         vectorstore,
         text_summaries,
-        texts_4k_token,
+        text_chunks,
         table_summaries,
         tables,
         image_summaries,
-        images_base64
+        images_base64,
+        image_paths
     )
     
     _retrievers[f"doc_{conv_id}"] = retriever
@@ -112,7 +201,7 @@ def load_existing_rag(conv_id: str):
             vectorstore,
             text_summaries=[], texts=[],
             table_summaries=[], tables=[],
-            image_summaries=[], images=[]
+            image_summaries=[], clip_embeddings=[], image_paths=[]
         )
         _retrievers[f"doc_{conv_id}"] = retriever
         print(f"✅ 기존 RAG retriever 로드 완료: {conv_id}")
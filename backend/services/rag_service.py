@@ -9,7 +9,7 @@ if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
 from langchain_openai import ChatOpenAI
-from video_vectorStore import VideoVectorStore
+from video_vectorStore import get_video_store
 from services.file_processor import get_retriever
 
 def query_rag_system(conv_id: str, query: str):
@@ -34,14 +34,12 @@ def query_rag_system(conv_id: str, query: str):
     
     try:
         collection_name = f"video_conv_{conv_id}"
-        video_store = VideoVectorStore(collection_name=collection_name)
+        video_store = get_video_store(collection_name=collection_name)
         video_results = video_store.search(query, k=3)
         
         for result in video_results:
-            metadata = result.get("metadata", {})
-            timestamp = metadata.get("timestamp", 0)
             video_sources.append({
-                "time": _format_timestamp(timestamp),
+                "time": _format_span(result),
                 "text": result.get("audio_text", result.get("text", ""))[:50] + "..."
             })
         
@@ -86,16 +84,15 @@ def query_rag_system(conv_id: str, query: str):
     
     # 영상 텍스트도 컨텍스트에 추가
     for result in video_results:
-        timestamp = result.get('timestamp', 0)
         audio_text = result.get('audio_text', '')
         visual_desc = result.get('visual_description', '')
-        # 영상 컨텍스트 포맷
-        video_context = f"""[영상 {_format_timestamp(timestamp)}]
+        # 영상 컨텍스트 포맷 (인접 세그먼트가 병합된 경우 구간으로 표시)
+        video_context = f"""[영상 {_format_span(result)}]
                             음성: {audio_text}
                             화면: {visual_desc[:100]}..."""
         
         text_context.append(video_context)
-        print(f"  🎬 영상 세그먼트 추가: [{_format_timestamp(timestamp)}]")
+        print(f"  🎬 영상 세그먼트 추가: [{_format_span(result)}]")
     
     # 4. LLM으로 답변 생성
     model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
@@ -151,4 +148,12 @@ def _format_timestamp(seconds: float) -> str:
     """초를 MM:SS 형식으로 변환"""
     minutes = int(seconds // 60)
     secs = int(seconds % 60)
-    return f"{minutes:02d}:{secs:02d}"
\ No newline at end of file
+    return f"{minutes:02d}:{secs:02d}"
+
+def _format_span(result: dict) -> str:
+    """영상 검색 결과의 시점 또는 병합된 구간을 MM:SS(~MM:SS) 형식으로 변환"""
+    start = result.get('timestamp', 0)
+    end = result.get('end_timestamp', start)
+    if end > start:
+        return f"{_format_timestamp(start)}~{_format_timestamp(end)}"
+    return _format_timestamp(start)
\ No newline at end of file
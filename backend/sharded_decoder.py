@@ -0,0 +1,76 @@
+import cv2
+import os
+from typing import List, Dict, Tuple
+from frame_reader import iter_video_frames, probe_video
+from process_pool import map_ordered_in_processes
+from scene_detector import SceneChangeDetector
+
+"""긴 영상의 구간 분할 병렬 디코딩: 시간 구간별로 프로세스 풀에서 디코딩 + 장면 감지"""
+
+
+def plan_shards(duration: float, fps: float, num_shards: int,
+                min_shard_seconds: float = 60.0) -> List[Tuple[float, float]]:
+    """영상을 샘플 격자에 맞춘 시간 구간 [(start, end), ...]으로 분할
+
+    경계를 샘플 시점(k / fps초)에 맞춰야 경계 프레임이 정확히 한 구간에만 속함
+    """
+    step = 1.0 / fps
+    total_samples = int(duration / step) + 1
+    num_shards = max(1, min(num_shards, int(duration // min_shard_seconds) or 1))
+
+    boundaries = [round(i * total_samples / num_shards) for i in range(num_shards + 1)]
+    shards = []
+    for first, last in zip(boundaries, boundaries[1:]):
+        if last > first:
+            shards.append((first * step, last * step))
+    # 마지막 구간은 영상 끝까지
+    shards[-1] = (shards[-1][0], duration + step)
+    return shards
+
+
+def _init_worker():
+    cv2.setNumThreads(1)
+
+
+def _detect_shard(video_path: str, fps: float, start: float, end: float,
+                  threshold: float, warmup: int) -> List[Dict]:
+    """한 구간을 디코딩하여 핵심 프레임 리스트 반환 (워커 프로세스에서 실행)
+
+    구간 시작 전 warmup개 샘플을 먼저 읽어 감지기 상태(이전 썸네일, 임계값 통계)를
+    채워두므로, 경계에서의 장면 전환도 순차 처리와 똑같이 한 번만 감지됨
+    """
+    step = 1.0 / fps
+    lead_in = max(start - warmup * step, 0.0)
+    detector = SceneChangeDetector(threshold=threshold)
+
+    key_frames = []
+    for frame_data in iter_video_frames(video_path, fps=fps, start=lead_in, end=end):
+        is_key = detector.update(frame_data['frame'])
+        # 워밍업 구간은 감지기 상태만 갱신하고 결과에는 넣지 않음 (이전 구간 담당)
+        if frame_data['timestamp'] + 1e-6 < start:
+            continue
+        if is_key:
+            key_frames.append(frame_data)
+    return key_frames
+
+
+def detect_key_frames_sharded(video_path: str, fps: float = 1, threshold: float = 25.0,
+                              max_workers: int = None, warmup: int = 30) -> List[Dict]:
+    """시간 구간별 병렬 디코딩 + 장면 감지 후 타임스탬프 순으로 병합"""
+    max_workers = max_workers or os.cpu_count() or 1
+    info = probe_video(video_path)
+    if info['duration'] <= 0:
+        raise ValueError(f"영상 길이를 확인할 수 없어 구간 분할을 할 수 없습니다: {video_path}")
+
+    shards = plan_shards(info['duration'], fps, max_workers)
+    print(f"  → {info['duration']:.0f}초 영상을 {len(shards)}개 구간으로 병렬 디코딩")
+
+    # 결과가 구간 순서대로 오므로 합친 결과도 타임스탬프 순
+    results = map_ordered_in_processes(
+        _detect_shard,
+        [(video_path, fps, start, end, threshold, warmup) for start, end in shards],
+        max_workers=len(shards),
+        initializer=_init_worker
+    )
+
+    return [frame_data for shard_frames in results for frame_data in shard_frames]
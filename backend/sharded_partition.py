@@ -0,0 +1,116 @@
+import fitz
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Tuple
+from unstructured.partition.pdf import partition_pdf
+from process_pool import map_ordered_in_processes
+from utils import list_images
+
+"""큰 PDF의 페이지 구간 분할 병렬 파싱: 페이지 구간별로 프로세스 풀에서 partition_pdf 실행 후 페이지 순서로 병합"""
+
+
+def get_page_count(filename: str) -> int:
+    with fitz.open(filename) as doc:
+        return doc.page_count
+
+
+def plan_page_ranges(page_count: int, num_ranges: int, min_pages: int = 8) -> List[Tuple[int, int]]:
+    """페이지를 연속 구간 [(first, last), ...]으로 분할 (0부터 시작, last 포함)
+
+    구간이 너무 작으면 레이아웃 모델 로딩 비용이 더 커지므로 구간당 최소 min_pages페이지
+    """
+    num_ranges = max(1, min(num_ranges, page_count // max(min_pages, 1) or 1))
+    boundaries = [round(i * page_count / num_ranges) for i in range(num_ranges + 1)]
+    return [(first, last - 1) for first, last in zip(boundaries, boundaries[1:]) if last > first]
+
+
+def partition_page_range(filename: str, first: int, last: int, image_dir: str,
+                         partition_kwargs: Dict) -> Tuple[list, List[str]]:
+    """first~last 페이지만 partition_pdf로 파싱 (워커 프로세스에서도 실행)
+
+    구간을 임시 PDF로 잘라 파싱한 뒤 요소의 page_number/filename을 원본 기준으로 되돌림
+    이미지는 구간 전용 image_dir에 저장되므로 다른 구간과 파일 이름이 겹치지 않음
+    반환: (요소 리스트, 저장된 이미지 경로 리스트)
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="pdf_range_")
+    try:
+        range_path = os.path.join(work_dir, f"pages_{first + 1}_{last + 1}.pdf")
+        with fitz.open(filename) as source, fitz.open() as part:
+            part.insert_pdf(source, from_page=first, to_page=last)
+            part.save(range_path)
+
+        elements = partition_pdf(
+            filename=range_path,
+            image_output_dir_path=image_dir,
+            **partition_kwargs,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    name, directory = os.path.basename(filename), os.path.dirname(os.path.abspath(filename))
+    for element in elements:
+        element.metadata.page_number = (element.metadata.page_number or 1) + first
+        element.metadata.filename = name
+        element.metadata.file_directory = directory
+
+    return elements, list_images(image_dir)
+
+
+def _init_worker():
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def partition_ranges_parallel(filename: str, ranges: List[Tuple[int, int, Dict]], figure_path: str,
+                              max_workers: int = None) -> Tuple[list, List[str]]:
+    """[(first, last, partition_kwargs), ...] 구간을 프로세스 풀에서 파싱하고 페이지 순서로 병합
+
+    구간마다 figure_path/pages_<first>_<last> 폴더에 이미지 저장
+    """
+    ranges = sorted(ranges, key=lambda r: r[0])
+    image_dirs = [os.path.join(figure_path, f"pages_{first + 1}_{last + 1}") for first, last, _ in ranges]
+
+    if len(ranges) == 1 or (max_workers or 0) == 1:
+        results = [
+            partition_page_range(filename, first, last, image_dir, kwargs)
+            for (first, last, kwargs), image_dir in zip(ranges, image_dirs)
+        ]
+    else:
+        # 결과가 구간 순서대로 오므로 합친 결과도 페이지 순
+        results = map_ordered_in_processes(
+            partition_page_range,
+            [(filename, first, last, image_dir, kwargs)
+             for (first, last, kwargs), image_dir in zip(ranges, image_dirs)],
+            max_workers=max_workers or os.cpu_count() or 1,
+            initializer=_init_worker
+        )
+
+    elements = [element for range_elements, _ in results for element in range_elements]
+    image_paths = [path for _, range_images in results for path in range_images]
+    return elements, image_paths
+
+
+def partition_pdf_sharded(filename: str, figure_path: str, partition_kwargs: Dict,
+                          max_workers: int = None, min_pages: int = 8,
+                          ranges_per_worker: int = 2) -> Tuple[list, List[str]]:
+    """PDF를 페이지 구간으로 나눠 병렬 파싱 (청크 구성 전 요소를 페이지 순서로 반환)
+
+    페이지마다 처리 시간이 달라 워커당 ranges_per_worker개 구간으로 나눠 부하를 고르게 분산
+    chunking_strategy는 여기서 적용하지 않음: 구간 경계에서 청크가 잘리지 않도록 병합 후 적용
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    page_count = get_page_count(filename)
+    page_ranges = plan_page_ranges(page_count, max_workers * ranges_per_worker, min_pages=min_pages)
+    print(f"  → {page_count}페이지 PDF를 {len(page_ranges)}개 구간으로 병렬 파싱 (워커 {max_workers}개)")
+
+    return partition_ranges_parallel(
+        filename,
+        [(first, last, partition_kwargs) for first, last in page_ranges],
+        figure_path,
+        max_workers=max_workers,
+    )
@@ -1,27 +1,159 @@
 import os
+import re
 import base64
 from langchain_openai import ChatOpenAI
+from llm_concurrency import RateLimiter, map_concurrent
+from summary_cache import SummaryCache, get_summary_cache
+from utils import count_tokens
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# 텍스트/테이블 요약
-def summarize_texts(texts, tables, summarize_texts_flag=True):
-    model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-    
-    text_summaries = []
-    if summarize_texts_flag:
-        for t in texts:
-            res = model.invoke(f"Summarize for retrieval: {t}")
-            # AIMessage → 문자열 추출
-            text_summaries.append(res.content if hasattr(res, "content") else str(res))
-    else:
-        text_summaries = texts
-
-    table_summaries = []
-    for t in tables:
-        res = model.invoke(f"Summarize for retrieval: {t}")
-        table_summaries.append(res.content if hasattr(res, "content") else str(res))
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_PROMPT = "Summarize for retrieval: {text}"
+
+# 짧은 표 여러 개를 한 요청으로 요약할 때 붙이는 지침 (구분자로 표별 요약을 나눠서 답하도록)
+TABLE_BATCH_PROMPT = """Summarize each of the following {count} tables for retrieval.
+Each table starts with a line <<<TABLE k>>>.
+Answer with exactly {count} summaries in order, each starting with its own line <<<SUMMARY k>>> and nothing else outside them.
+
+{tables}"""
+
+_SUMMARY_MARKER = re.compile(r"<<<SUMMARY (\d+)>>>")
+
+
+def _response_text(res):
+    # AIMessage → 문자열 추출
+    return res.content if hasattr(res, "content") else str(res)
+
+
+def _parse_table_summaries(text, count):
+    """<<<SUMMARY k>>> 구분자로 나뉜 응답을 표 순서대로 파싱 (개수가 맞지 않으면 ValueError)"""
+    parts = _SUMMARY_MARKER.split(text)
+    summaries = {}
+    # split 결과: [머리말, 번호, 내용, 번호, 내용, ...]
+    for number, body in zip(parts[1::2], parts[2::2]):
+        k = int(number)
+        if 1 <= k <= count and body.strip():
+            summaries[k] = body.strip()
+    if len(summaries) != count:
+        raise ValueError(f"표 묶음 응답 개수 불일치: {len(summaries)}/{count}")
+    return [summaries[k] for k in range(1, count + 1)]
+
+
+def _pack_tables(tables, indices, batch_size, max_batch_tokens):
+    """indices의 표 중 연속된 짧은 표를 batch_size개, 합계 max_batch_tokens 토큰 이하로 묶은 인덱스 그룹 리스트"""
+    groups, current, current_tokens = [], [], 0
+    for i in indices:
+        tokens = count_tokens(tables[i])
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_batch_tokens):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _table_job(tables, indices):
+    if len(indices) == 1:
+        return ("table", indices, SUMMARY_PROMPT.format(text=tables[indices[0]]))
+    body = "\n\n".join(f"<<<TABLE {k}>>>\n{tables[i]}" for k, i in enumerate(indices, start=1))
+    return ("table", indices, TABLE_BATCH_PROMPT.format(count=len(indices), tables=body))
+
+
+def summarize_texts(texts, tables, summarize_texts_flag=True, max_concurrency=4,
+                    requests_per_minute=None, tokens_per_minute=None, max_retries=3,
+                    table_batch_size=1, max_batch_tokens=2000, output_tokens=256, use_cache=True):
+    """텍스트/테이블 요약 (동시 요청, 입력 순서대로 반환)
+
+    max_concurrency: 동시에 보내는 요청 수
+    requests_per_minute/tokens_per_minute: 분당 요청/토큰 한도 (토큰은 입력 + 요약당 output_tokens로 추정)
+    일시적 오류는 백오프 후 재시도하고, 끝내 실패한 항목은 원문을 요약 대신 사용
+    table_batch_size > 1이면 짧은 표를 max_batch_tokens 토큰 이하로 묶어 한 요청으로 요약하고,
+    응답을 표 개수만큼 나누지 못한 묶음은 표별 요청으로 다시 요약
+    use_cache=True면 같은 내용/모델/프롬프트로 만든 요약을 캐시에서 재사용
+    (묶음 요약은 표별로 저장하되 키에는 묶음 프롬프트를 사용)
+    """
+    model = ChatOpenAI(temperature=0, model=SUMMARY_MODEL)
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    cache = get_summary_cache() if use_cache else None
+
+    text_summaries = [None] * len(texts) if summarize_texts_flag else list(texts)
+    table_summaries = [None] * len(tables)
+    outputs = {"text": text_summaries, "table": table_summaries}
+    sources = {"text": texts, "table": tables}
+
+    def cache_key(kind, i, prompt=SUMMARY_PROMPT):
+        return SummaryCache.make_key(sources[kind][i], SUMMARY_MODEL, prompt)
+
+    def lookup_keys(kind, i):
+        # 표는 단독 요청과 묶음 요청 중 어느 쪽으로 만들어졌을 수도 있음
+        if kind == "table":
+            return [cache_key(kind, i), cache_key(kind, i, TABLE_BATCH_PROMPT)]
+        return [cache_key(kind, i)]
+
+    # 캐시에 없는 항목만 요청
+    pending = {"text": list(range(len(texts))) if summarize_texts_flag else [], "table": list(range(len(tables)))}
+    if cache is not None:
+        for kind, indices in pending.items():
+            remaining = []
+            for i in indices:
+                cached = cache.get_first(lookup_keys(kind, i))
+                if cached is None:
+                    remaining.append(i)
+                else:
+                    outputs[kind][i] = cached
+            pending[kind] = remaining
+        requested = len(pending["text"]) + len(pending["table"])
+        cached_count = (len(texts) if summarize_texts_flag else 0) + len(tables) - requested
+        print(f"  → 요약 캐시 적중 {cached_count}개, 요청 {requested}개")
+
+    # 요청 단위 작업: (종류, 인덱스 리스트, 프롬프트)
+    jobs = [("text", [i], SUMMARY_PROMPT.format(text=texts[i])) for i in pending["text"]]
+    for group in _pack_tables(tables, pending["table"], max(1, table_batch_size), max_batch_tokens):
+        jobs.append(_table_job(tables, group))
+
+    def run(job):
+        kind, indices, prompt = job
+        res = model.invoke(prompt)
+        if len(indices) == 1:
+            return [_response_text(res)]
+        return _parse_table_summaries(_response_text(res), len(indices))
+
+    def cost(job):
+        return count_tokens(job[2]) + output_tokens * len(job[1])
+
+    def progress(done, total):
+        print(f"  ✓ 요약 {done}/{total}")
+
+    while jobs:
+        results, errors = map_concurrent(
+            run, jobs,
+            max_workers=max_concurrency,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            on_done=progress,
+            cost=cost
+        )
+
+        retry_jobs = []
+        for j, (kind, indices, _) in enumerate(jobs):
+            if j not in errors:
+                # 실제로 요약을 만든 프롬프트로 저장
+                prompt = TABLE_BATCH_PROMPT if len(indices) > 1 else SUMMARY_PROMPT
+                for i, summary in zip(indices, results[j]):
+                    outputs[kind][i] = summary
+                    if cache is not None:
+                        cache.put(cache_key(kind, i, prompt), summary)
+            elif len(indices) > 1:
+                print(f"  ⚠️ 표 {len(indices)}개 묶음 요약 실패, 표별로 다시 요약: {errors[j]}")
+                retry_jobs.extend(_table_job(tables, [i]) for i in indices)
+            else:
+                print(f"  ❌ {kind} {indices[0]} 요약 실패, 원문 사용: {errors[j]}")
+                outputs[kind][indices[0]] = sources[kind][indices[0]]
+        jobs = retry_jobs
 
     return text_summaries, table_summaries
 
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence, Union
+
+"""LLM 요약 캐시: (내용 해시 + 모델 + 프롬프트) → 요약 텍스트를 SQLite에 저장 (대화 간 공유)"""
+
+
+class SummaryCache:
+    def __init__(self, path: str = "./summary_cache/summaries.db", max_bytes: int = 512 * 1024 ** 2):
+        """
+        path: SQLite 파일 경로
+        max_bytes: 저장된 요약 전체 최대 크기. 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 요약 생성은 여러 스레드에서 진행되므로 연결 하나를 락으로 보호해서 공유
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries(last_used)")
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+
+    @staticmethod
+    def make_key(content: Union[str, bytes], model: str, prompt: str) -> str:
+        """내용 + 모델 + 프롬프트의 SHA-256 (셋 중 하나라도 바뀌면 다른 키)"""
+        digest = hashlib.sha256()
+        for part in (model, prompt, content):
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            # 길이를 앞에 붙여 경계가 다른 조합이 같은 키가 되지 않도록 함
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """캐시된 요약 (없으면 None)"""
+        return self.get_first([key])
+
+    def get_first(self, keys: Sequence[str]) -> Optional[str]:
+        """keys 중 처음으로 캐시된 요약 (같은 내용을 여러 프롬프트로 만들 수 있을 때, 조회 1회로 집계)"""
+        with self._lock, self._conn:
+            for key in keys:
+                row = self._conn.execute("SELECT value FROM summaries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    # 마지막 사용 시각 갱신 (LRU 삭제 기준)
+                    self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM summaries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """최대 크기의 90%가 될 때까지 오래 사용하지 않은 항목부터 삭제 (락 안에서 호출)"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM summaries ORDER BY last_used").fetchall()
+        removed = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            removed.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM summaries WHERE key = ?", removed)
+        print(f"  → 요약 캐시 정리: {len(removed)}개 삭제")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'bytes': self._bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """프로세스 전체에서 공유하는 요약 캐시 (첫 호출 때 생성)"""
+    global _summary_cache
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache()
+        return _summary_cache
@@ -0,0 +1,106 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+"""영상 검색 후처리: 시간/영상 필터, 인접 구간 병합, 타임라인 다양성(MMR) 선택"""
+
+
+def build_where(time_range: Optional[Tuple[float, float]] = None, video_id: Optional[str] = None) -> Optional[Dict]:
+    """Chroma 메타데이터 필터 생성 (time_range: (시작초, 끝초), 한쪽은 None 가능)"""
+    clauses = []
+    if time_range is not None:
+        start, end = time_range
+        if start is not None:
+            clauses.append({'timestamp': {'$gte': float(start)}})
+        if end is not None:
+            clauses.append({'timestamp': {'$lte': float(end)}})
+    if video_id is not None:
+        clauses.append({'video_id': video_id})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {'$and': clauses}
+
+
+def _join_unique(texts: List[str], separator: str = " ") -> str:
+    """빈 문자열과 중복을 제외하고 순서대로 이어붙이기"""
+    seen = set()
+    parts = []
+    for text in texts:
+        text = (text or '').strip()
+        if text and text not in seen:
+            seen.add(text)
+            parts.append(text)
+    return separator.join(parts)
+
+
+def merge_adjacent(segments: List[Dict], max_gap: float = 10.0) -> List[Dict]:
+    """같은 영상에서 시간 간격이 max_gap초 이하인 세그먼트를 하나의 구간으로 병합
+
+    병합된 구간: timestamp=첫 프레임, end_timestamp=마지막 프레임, 음성/화면 설명은 중복 없이 이어붙임,
+    relevance=구성 세그먼트 중 최댓값. 결과는 relevance 내림차순
+    """
+    ordered = sorted(segments, key=lambda s: (s['metadata'].get('video_id', ''), s['timestamp']))
+
+    groups = []
+    for segment in ordered:
+        last = groups[-1][-1] if groups else None
+        if (last is not None
+                and last['metadata'].get('video_id', '') == segment['metadata'].get('video_id', '')
+                and segment['timestamp'] - last['timestamp'] <= max_gap):
+            groups[-1].append(segment)
+        else:
+            groups.append([segment])
+
+    spans = []
+    for group in groups:
+        first = group[0]
+        if len(group) == 1:
+            spans.append({**first, 'end_timestamp': first['timestamp'], 'segments_merged': 1})
+            continue
+
+        audio_text = _join_unique([s['audio_text'] for s in group])
+        spans.append({
+            **first,
+            'end_timestamp': group[-1]['timestamp'],
+            'audio_text': audio_text,
+            'text': audio_text,
+            'visual_description': _join_unique([s['visual_description'] for s in group], separator="\n"),
+            'summary': _join_unique([s['summary'] for s in group], separator="\n"),
+            'relevance': max(s.get('relevance', 0.0) for s in group),
+            'segments_merged': len(group),
+        })
+
+    spans.sort(key=lambda s: s.get('relevance', 0.0), reverse=True)
+    return spans
+
+
+def _temporal_similarity(a: Dict, b: Dict, time_scale: float) -> float:
+    """같은 영상에서 가까운 시점일수록 1에 가까움 (다른 영상이면 0)"""
+    if a['metadata'].get('video_id', '') != b['metadata'].get('video_id', ''):
+        return 0.0
+    # 구간끼리의 거리 (겹치면 0)
+    gap = max(0.0,
+              b['timestamp'] - a.get('end_timestamp', a['timestamp']),
+              a['timestamp'] - b.get('end_timestamp', b['timestamp']))
+    return math.exp(-gap / time_scale)
+
+
+def select_diverse(candidates: List[Dict], k: int, diversity: float = 0.3,
+                   time_scale: float = 60.0) -> List[Dict]:
+    """시간 축 MMR: 관련도가 높으면서 이미 고른 구간과 시간적으로 떨어진 후보를 차례로 선택
+
+    diversity: 0이면 관련도 순, 클수록 타임라인 분산을 우선
+    """
+    remaining = list(candidates)
+    selected = []
+    while remaining and len(selected) < k:
+        def mmr_score(candidate):
+            redundancy = max((_temporal_similarity(candidate, s, time_scale) for s in selected), default=0.0)
+            return (1 - diversity) * candidate.get('relevance', 0.0) - diversity * redundancy
+
+        best = max(remaining, key=mmr_score)
+        remaining.remove(best)
+        selected.append(best)
+    return selected
@@ -0,0 +1,202 @@
+import os
+import re
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+"""음성 변환: 무음 구간 기준 분할 → 압축 코덱 인코딩 → 병렬 전사 → 타임스탬프 병합"""
+
+
+class TranscriptionBackend(ABC):
+    """전사 백엔드 인터페이스
+
+    오디오 파일 하나를 받아 파일 시작 기준 상대 시간의 세그먼트 리스트를 반환
+    [{'start': float, 'end': float, 'text': str}, ...]
+    """
+    @abstractmethod
+    def transcribe(self, audio_path: str) -> List[Dict]:
+        pass
+
+
+class WhisperAPIBackend(TranscriptionBackend):
+    """OpenAI Whisper API"""
+    def __init__(self, client, model: str = "whisper-1"):
+        self.client = client
+        self.model = model
+
+    def transcribe(self, audio_path: str) -> List[Dict]:
+        with open(audio_path, "rb") as audio_file:
+            transcript = self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                response_format="verbose_json",
+                timestamp_granularities=["segment"]
+            )
+
+        return [
+            {'start': segment.start, 'end': segment.end, 'text': segment.text}
+            for segment in (transcript.segments or [])
+        ]
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """로컬 whisper 모델 (오프라인 벤치마크용, openai-whisper 설치 필요)"""
+    def __init__(self, model_name: str = "base"):
+        try:
+            import whisper
+        except ImportError as e:
+            raise ImportError("LocalWhisperBackend를 쓰려면 openai-whisper를 설치하세요: pip install openai-whisper") from e
+        self.model = whisper.load_model(model_name)
+        # 모델 하나를 여러 워커가 공유하므로 추론은 직렬화
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio_path: str) -> List[Dict]:
+        with self._lock:
+            result = self.model.transcribe(audio_path)
+        return [
+            {'start': s['start'], 'end': s['end'], 'text': s['text']}
+            for s in result.get('segments', [])
+        ]
+
+
+class ChunkedTranscriber:
+    def __init__(self, backend: TranscriptionBackend, output_dir: str = "./video_data",
+                 max_chunk_seconds: float = 600, max_workers: int = 4,
+                 codec: str = "libopus", bitrate: str = "32k", extension: str = ".ogg",
+                 silence_db: int = -35, min_silence: float = 0.5, min_tail_seconds: float = 1.0):
+        """
+        max_chunk_seconds: 청크 최대 길이 (초). 32kbps Opus 기준 10분 ≈ 2.4MB로 업로드 제한(25MB)보다 충분히 작음
+        max_workers: 동시에 전사할 청크 수
+        codec/bitrate/extension: 청크 인코딩 설정 (FFmpeg)
+        silence_db/min_silence: 무음 판단 기준 (silencedetect 필터)
+        min_tail_seconds: 마지막 청크가 이보다 짧으면 앞 청크에 합침 (Whisper는 0.1초 미만 오디오를 거부)
+        """
+        self.backend = backend
+        self.output_dir = output_dir
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_workers = max_workers
+        self.codec = codec
+        self.bitrate = bitrate
+        self.extension = extension
+        self.silence_db = silence_db
+        self.min_silence = min_silence
+        self.min_tail_seconds = min_tail_seconds
+        os.makedirs(output_dir, exist_ok=True)
+
+    def get_duration(self, audio_path: str) -> float:
+        """FFprobe로 오디오 길이(초) 조회"""
+        command = [
+            'ffprobe', '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            audio_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        try:
+            return float(result.stdout.strip())
+        except ValueError:
+            raise RuntimeError(f"오디오 길이를 확인할 수 없습니다: {audio_path}")
+
+    def detect_silences(self, audio_path: str) -> List[Tuple[float, float]]:
+        """FFmpeg silencedetect로 무음 구간 [(start, end), ...] 검출"""
+        command = [
+            'ffmpeg', '-i', audio_path,
+            '-af', f'silencedetect=noise={self.silence_db}dB:d={self.min_silence}',
+            '-f', 'null', '-'
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+
+        silences = []
+        silence_start = None
+        for line in result.stderr.splitlines():
+            match = re.search(r'silence_start: (-?[\d.]+)', line)
+            if match:
+                silence_start = max(float(match.group(1)), 0.0)
+                continue
+            match = re.search(r'silence_end: ([\d.]+)', line)
+            if match and silence_start is not None:
+                silences.append((silence_start, float(match.group(1))))
+                silence_start = None
+        return silences
+
+    def plan_chunks(self, duration: float, silences: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """최대 길이를 넘지 않도록 무음 구간 중앙에서 자르는 청크 경계 계산
+
+        한도 안에 무음 구간이 없으면 한도 위치에서 강제로 자름
+        자르고 남은 마지막 청크가 min_tail_seconds보다 짧으면 앞 청크에 합침
+        (이 경우 마지막 청크는 최대 길이를 min_tail_seconds 미만만큼 넘을 수 있음)
+        """
+        cut_points = sorted((start + end) / 2 for start, end in silences)
+        # 너무 짧은 청크가 생기지 않도록 최소 길이를 둠
+        min_chunk = self.max_chunk_seconds / 4
+
+        chunks = []
+        start = 0.0
+        while duration - start > self.max_chunk_seconds:
+            limit = start + self.max_chunk_seconds
+            candidates = [c for c in cut_points if start + min_chunk < c <= limit]
+            cut = candidates[-1] if candidates else limit
+            chunks.append((start, cut))
+            start = cut
+        if chunks and duration - start < self.min_tail_seconds:
+            chunks[-1] = (chunks[-1][0], duration)
+        else:
+            chunks.append((start, duration))
+        return chunks
+
+    def encode_chunk(self, audio_path: str, start: float, end: float, index: int) -> str:
+        """구간을 압축 코덱으로 잘라 저장"""
+        audio_name = os.path.splitext(os.path.basename(audio_path))[0]
+        chunk_path = os.path.join(self.output_dir, f"{audio_name}_chunk{index:03d}{self.extension}")
+
+        command = [
+            'ffmpeg', '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}',
+            '-i', audio_path,
+            '-vn',
+            '-ac', '1',
+            '-ar', '16000',
+            '-c:a', self.codec,
+            '-b:a', self.bitrate,
+            '-y',
+            chunk_path
+        ]
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return chunk_path
+
+    def _transcribe_chunk(self, audio_path: str, index: int, start: float, end: float) -> List[Dict]:
+        chunk_path = self.encode_chunk(audio_path, start, end, index)
+        try:
+            segments = self.backend.transcribe(chunk_path)
+        finally:
+            if os.path.exists(chunk_path):
+                os.remove(chunk_path)
+
+        # 청크 기준 상대 시간 → 원본 기준 절대 시간
+        return [
+            {
+                'start': segment['start'] + start,
+                'end': segment['end'] + start,
+                'text': segment['text']
+            }
+            for segment in segments
+        ]
+
+    def transcribe(self, audio_path: str) -> List[Dict]:
+        """청크 분할 후 병렬 전사, 타임스탬프 순으로 병합한 세그먼트 반환"""
+        duration = self.get_duration(audio_path)
+        silences = self.detect_silences(audio_path) if duration > self.max_chunk_seconds else []
+        chunks = self.plan_chunks(duration, silences)
+        print(f"  → 오디오 {duration:.0f}초를 {len(chunks)}개 청크로 분할 (동시 {self.max_workers}개)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._transcribe_chunk, audio_path, i, start, end)
+                for i, (start, end) in enumerate(chunks)
+            ]
+            results = [future.result() for future in futures]
+
+        segments = [segment for chunk_segments in results for segment in chunk_segments]
+        segments.sort(key=lambda s: s['start'])
+        return segments
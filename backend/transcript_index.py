@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+"""음성 세그먼트 구간 인덱스: 시작 시간 정렬 + bisect로 O(log n) 조회"""
+
+
+class TranscriptIndex:
+    def __init__(self, segments: List[Dict]):
+        self.segments = sorted(segments, key=lambda s: s['start'])
+        self.starts = [s['start'] for s in self.segments]
+
+        # i번째까지의 최대 end (단조 증가라 bisect 가능, 겹치는 세그먼트도 처리)
+        self.max_ends = []
+        max_end = float('-inf')
+        for segment in self.segments:
+            max_end = max(max_end, segment['end'])
+            self.max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def find(self, timestamp: float) -> Optional[Dict]:
+        """timestamp를 포함하는 세그먼트, 없으면 시작 시간이 가장 가까운 세그먼트"""
+        if not self.segments:
+            return None
+
+        # 시작 시간이 timestamp 이하인 마지막 세그먼트
+        last = bisect_right(self.starts, timestamp) - 1
+        if last >= 0:
+            # end >= timestamp인 첫 세그먼트 (max_ends가 처음으로 timestamp에 닿는 위치)
+            first = bisect_left(self.max_ends, timestamp, 0, last + 1)
+            if first <= last:
+                return self.segments[first]
+
+        # 포함하는 세그먼트가 없으면 앞뒤 이웃 중 시작 시간이 가까운 쪽
+        candidates = [i for i in (last, last + 1) if 0 <= i < len(self.segments)]
+        nearest = min(candidates, key=lambda i: abs(self.starts[i] - timestamp))
+        return self.segments[nearest]
+
+    def overlapping(self, start: float, end: float) -> List[Dict]:
+        """[start, end) 구간과 겹치는 모든 세그먼트 (시작 시간 순)"""
+        if not self.segments or end < start:
+            return []
+
+        # 시작 시간이 end보다 앞선 세그먼트까지 (start == end면 그 시점에 시작하는 것 포함)
+        hi = bisect_right(self.starts, end) if end == start else bisect_left(self.starts, end)
+        # end가 start를 넘는 세그먼트가 처음 나올 수 있는 위치
+        lo = bisect_right(self.max_ends, start)
+        return [s for s in self.segments[lo:hi] if s['end'] > start or s['start'] == start]
+
+    def text_at(self, timestamp: float) -> str:
+        segment = self.find(timestamp)
+        return segment['text'] if segment else ''
+
+    def text_between(self, start: float, end: float) -> str:
+        """구간 안의 발화를 이어붙인 텍스트 (겹치는 세그먼트가 없으면 가장 가까운 세그먼트)"""
+        segments = self.overlapping(start, end)
+        if not segments:
+            return self.text_at(start)
+        return " ".join(s['text'].strip() for s in segments)
@@ -1,5 +1,8 @@
 import base64
 import io
+import os
+import tiktoken
+from functools import lru_cache
 from PIL import Image
 
 def base64_to_image(base64_str):
@@ -11,4 +14,22 @@ def resize_base64_image(base64_str, size=(128, 128)):
     resized = img.resize(size, Image.LANCZOS)
     buf = io.BytesIO()
     resized.save(buf, format=img.format)
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
\ No newline at end of file
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+def list_images(folder):
+    """폴더 안의 이미지 파일 경로 (이름순)"""
+    return [
+        os.path.join(folder, f)
+        for f in sorted(os.listdir(folder))
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name="cl100k_base"):
+    """tiktoken 인코더 (프로세스당 한 번만 로드)"""
+    return tiktoken.get_encoding(encoding_name)
+
+def count_tokens(text, encoding_name="cl100k_base"):
+    return len(get_encoder(encoding_name).encode(text))
@@ -0,0 +1,122 @@
+import cv2
+import hashlib
+import json
+import os
+import pickle
+import time
+import numpy as np
+from typing import Dict, Optional
+
+"""영상 처리 결과 캐시: 파일 내용 해시 + 처리 파라미터를 키로 로컬 디스크에 저장"""
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """파일 내용의 SHA-256 (큰 영상도 메모리에 올리지 않고 나눠 읽음)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VideoArtifactCache:
+    def __init__(self, cache_dir: str = "./video_cache", max_bytes: int = 5 * 1024 ** 3,
+                 max_age_seconds: float = 30 * 24 * 3600):
+        """
+        max_bytes: 캐시 전체 최대 크기. 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+        max_age_seconds: 마지막 사용 후 이 시간이 지난 항목은 삭제
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, video_path: str, params: Dict, content_digest: str = None) -> str:
+        """파일 내용 해시 + 처리 파라미터로 캐시 키 생성 (content_digest를 주면 파일을 다시 읽지 않음)"""
+        content_digest = content_digest or file_digest(video_path)
+        payload = json.dumps({'content': content_digest, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str, decode_frames: bool = False) -> Optional[Dict]:
+        """캐시된 처리 결과 반환 (없거나 만료되었으면 None)
+
+        decode_frames=False면 key_frames의 frame은 저장된 JPEG 바이트 그대로 둠
+        (임베딩만 쓰는 경우 전체 핵심 프레임을 디코딩하지 않도록). 필요하면 decode_key_frames 사용
+        """
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+
+        if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+            os.remove(path)
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                artifacts = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ 캐시 항목 손상, 삭제: {path} ({e})")
+            os.remove(path)
+            return None
+
+        # 마지막 사용 시각 갱신 (LRU 삭제 기준)
+        os.utime(path)
+
+        if decode_frames:
+            artifacts['key_frames'] = self.decode_key_frames(artifacts.get('key_frames', []))
+        return artifacts
+
+    @staticmethod
+    def decode_key_frames(key_frames):
+        """캐시에 JPEG로 저장된 핵심 프레임을 OpenCV 이미지로 디코딩"""
+        return [
+            {**frame_data, 'frame': cv2.imdecode(np.frombuffer(frame_data['frame'], np.uint8), cv2.IMREAD_COLOR)}
+            for frame_data in key_frames
+        ]
+
+    def put(self, key: str, artifacts: Dict):
+        """처리 결과 저장 (key_frames, text_segments, embeddings)
+
+        핵심 프레임은 고품질 JPEG로 압축해서 저장
+        """
+        stored = dict(artifacts)
+        stored['key_frames'] = [
+            {**frame_data, 'frame': cv2.imencode('.jpg', frame_data['frame'], [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()}
+            for frame_data in artifacts.get('key_frames', [])
+        ]
+
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # 쓰는 도중 읽히지 않도록 완성된 파일로 교체
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """만료 항목 삭제 후, 최대 크기를 넘으면 오래 사용하지 않은 항목부터 삭제"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                os.remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
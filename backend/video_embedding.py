@@ -1,31 +1,14 @@
 from typing import List, Dict
 import base64
+import json
 import cv2
 from langchain_openai import ChatOpenAI
+from frame_dedup import FrameHashIndex, dedup_thumbnail, dhash
+from llm_concurrency import RateLimiter, map_concurrent
+from summary_cache import SummaryCache, get_summary_cache
+from transcript_index import TranscriptIndex
 
-class VideoEmbedder:
-    def __init__(self):
-        self.model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-    
-    def frame_to_base64(self, frame) -> str:
-        """OpenCV 프레임을 base64로 인코딩"""
-        _, buffer = cv2.imencode('.jpg', frame)
-        return base64.b64encode(buffer).decode('utf-8')
-    
-    def find_text_at_timestamp(self, text_segments: List[Dict], timestamp: float) -> str:
-        """특정 타임스탬프에 해당하는 텍스트 찾기"""
-        for segment in text_segments:
-            if segment['start'] <= timestamp <= segment['end']:
-                return segment['text']
-        
-        # 가장 가까운 텍스트 찾기
-        closest_segment = min(text_segments, 
-                            key=lambda s: abs(s['start'] - timestamp))
-        return closest_segment['text']
-    
-    def analyze_frame_with_gpt4(self, frame_base64: str) -> str:
-        """GPT-4o-mini로 프레임 내용 분석"""
-        prompt = """이 영상 프레임을 매우 구체적으로 분석해주세요:
+FRAME_ANALYSIS_PROMPT = """이 영상 프레임을 매우 구체적으로 분석해주세요:
 
                     **필수 포함 사항:**
                     1. 화면에 보이는 텍스트나 숫자 (정확히 읽어주세요)
@@ -41,68 +24,360 @@ class VideoEmbedder:
 
                     예시: "화면 왼쪽에 'Revenue Growth 2024' 제목의 막대 그래프, Q1: 25%, Q2: 32%, Q3: 28%의 데이터가 표시됨"
                 """
+
+BATCH_ANALYSIS_INSTRUCTION = """
+                    아래에 {count}개의 프레임이 [프레임 1]부터 [프레임 {count}]까지 순서대로 주어집니다.
+                    각 프레임을 위 기준에 따라 서로 독립적으로 분석하세요.
+                    다른 설명 없이 아래 형식의 JSON 배열로만 답하세요:
+                    [{{"frame": 1, "description": "..."}}, {{"frame": 2, "description": "..."}}]
+                """
+
+class FrameEncodingPolicy:
+    """프레임 JPEG 인코딩 정책
+
+    thumbnail_*: 벡터 DB 저장 및 UI 표시용 작은 썸네일
+    analysis_*: 비전 모델에 보내는 분석용 이미지 (글자를 읽을 수 있을 정도의 크기)
+    low_detail: 비전 요청에 detail="low"를 지정하여 이미지 토큰을 줄임
+    """
+    def __init__(self, thumbnail_max_edge: int = 480, thumbnail_quality: int = 70,
+                 analysis_max_edge: int = 1024, analysis_quality: int = 85, low_detail: bool = False):
+        self.thumbnail_max_edge = thumbnail_max_edge
+        self.thumbnail_quality = thumbnail_quality
+        self.analysis_max_edge = analysis_max_edge
+        self.analysis_quality = analysis_quality
+        self.low_detail = low_detail
+    
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+class VideoEmbedder:
+    def __init__(self, model=None, dedup_distance: int = 24, dedup_changed_ratio: float = 0.0002,
+                 max_concurrency: int = 4,
+                 requests_per_minute: int = None, max_retries: int = 3, batch_size: int = 1,
+                 encoding: FrameEncodingPolicy = None, use_cache: bool = True):
+        """
+        model: 비전 채팅 모델 또는 모델 이름 (None이면 gpt-4o-mini). invoke(messages)를 지원하면 로컬 가짜 모델도 가능
+        dedup_distance: 중복 후보로 볼 지각 해시 최대 해밍 거리 (256비트 기준)
+        dedup_changed_ratio: 후보를 중복으로 확정할 썸네일 최대 변경 픽셀 비율
+        max_concurrency: 동시에 보낼 프레임 분석 요청 수 (1이면 순차 처리)
+        requests_per_minute: 분당 최대 요청 수 (None이면 제한 없음)
+        max_retries: 일시적 오류(레이트 리밋, 타임아웃 등) 재시도 횟수
+        batch_size: 한 요청에 묶어 보낼 프레임 수 (1이면 프레임마다 요청)
+        encoding: 저장용 썸네일/분석용 이미지 인코딩 정책
+        use_cache: 같은 분석용 이미지/모델/프롬프트의 시각 설명을 요약 캐시에서 재사용
+        """
+        if model is None or isinstance(model, str):
+            model = ChatOpenAI(temperature=0, model=model or "gpt-4o-mini")
+        self.model = model
+        self.dedup_distance = dedup_distance
+        self.dedup_changed_ratio = dedup_changed_ratio
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.encoding = encoding or FrameEncodingPolicy()
+        self.cache = get_summary_cache() if use_cache else None
+        self.model_name = getattr(self.model, "model_name", None) or type(self.model).__name__
+        self.stats = {}
+    
+    def frame_to_base64(self, frame, max_edge: int = None, quality: int = None) -> str:
+        """OpenCV 프레임을 base64로 인코딩
+
+        max_edge: 긴 변이 이보다 크면 비율을 유지하며 축소
+        quality: JPEG 품질 (None이면 OpenCV 기본값 95)
+        """
+        height, width = frame.shape[:2]
+        if max_edge and max(height, width) > max_edge:
+            scale = max_edge / max(height, width)
+            frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality else []
+        _, buffer = cv2.imencode('.jpg', frame, params)
+        return base64.b64encode(buffer).decode('utf-8')
+    
+    def _image_part(self, frame_base64: str) -> Dict:
+        """비전 요청용 이미지 항목 (low_detail이면 저해상도 처리 요청으로 토큰 절약)"""
+        image_url = {"url": f"data:image/jpeg;base64,{frame_base64}"}
+        if self.encoding.low_detail:
+            image_url["detail"] = "low"
+        return {"type": "image_url", "image_url": image_url}
+    
+    def describe_frame(self, frame_base64: str) -> str:
+        """GPT-4o-mini로 프레임 내용 분석 (실패 시 예외 발생)"""
+        response = self.model.invoke([
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": FRAME_ANALYSIS_PROMPT},
+                    self._image_part(frame_base64)
+                ]
+            }
+        ])
+        return response.content if hasattr(response, "content") else str(response)
+    
+    def describe_frames(self, frames_base64: List[str]) -> List[str]:
+        """여러 프레임을 한 번의 요청으로 분석하여 프레임별 설명 리스트 반환
+
+        긴 분석 지침은 요청당 한 번만 보내고, 각 이미지 앞에 [프레임 k] 라벨을 붙임.
+        응답을 프레임 수만큼 파싱하지 못하면 ValueError 발생
+        """
+        content = [{"type": "text", "text": FRAME_ANALYSIS_PROMPT + BATCH_ANALYSIS_INSTRUCTION.format(count=len(frames_base64))}]
+        for k, frame_base64 in enumerate(frames_base64, start=1):
+            content.append({"type": "text", "text": f"[프레임 {k}]"})
+            content.append(self._image_part(frame_base64))
         
+        response = self.model.invoke([{"role": "user", "content": content}])
+        text = response.content if hasattr(response, "content") else str(response)
+        return self._parse_batch_descriptions(text, len(frames_base64))
+    
+    def _parse_batch_descriptions(self, text: str, count: int) -> List[str]:
+        """[{"frame": k, "description": "..."}] 형식 응답을 프레임 순서대로 파싱"""
+        # ```json ... ``` 코드 블록으로 감싸서 답하는 경우 제거
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+            text = text.rsplit("```", 1)[0]
+        
+        parsed = json.loads(text)
+        if not isinstance(parsed, list):
+            raise ValueError("배치 응답이 JSON 배열이 아닙니다")
+        
+        descriptions = {}
+        for entry in parsed:
+            frame_no = int(entry["frame"])
+            description = str(entry["description"]).strip()
+            if 1 <= frame_no <= count and description:
+                descriptions[frame_no] = description
+        
+        if len(descriptions) != count:
+            raise ValueError(f"배치 응답 프레임 수 불일치: {len(descriptions)}/{count}")
+        return [descriptions[k] for k in range(1, count + 1)]
+    
+    def _cache_key(self, frame_base64: str, batched: bool = False) -> str:
+        """시각 설명 캐시 키 (설명을 만든 프롬프트 기준: 배치 요청이면 배치 지침 포함)"""
+        prompt = FRAME_ANALYSIS_PROMPT + (BATCH_ANALYSIS_INSTRUCTION if batched else "")
+        # detail 설정에 따라 설명이 달라지므로 프롬프트 키에 포함
+        prompt += "\n[detail=low]" if self.encoding.low_detail else ""
+        return SummaryCache.make_key(frame_base64, self.model_name, prompt)
+    
+    def _cached_description(self, frame_base64: str):
+        """단독/배치 요청 중 어느 쪽으로 만든 설명이든 캐시에 있으면 반환"""
+        return self.cache.get_first([
+            self._cache_key(frame_base64),
+            self._cache_key(frame_base64, batched=True)
+        ])
+    
+    def analyze_frame_with_gpt4(self, frame_base64: str) -> str:
+        """GPT-4o-mini로 프레임 내용 분석"""
+        if self.cache is not None:
+            cached = self._cached_description(frame_base64)
+            if cached is not None:
+                return cached
         try:
-            response = self.model.invoke([
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url", 
-                            "image_url": {"url": f"data:image/jpeg;base64,{frame_base64}"}
-                        }
-                    ]
-                }
-            ])
-            return response.content if hasattr(response, "content") else str(response)
+            description = self.describe_frame(frame_base64)
         except Exception as e:
             return f"프레임 분석 실패: {str(e)}"
+        if self.cache is not None:
+            self.cache.put(self._cache_key(frame_base64), description)
+        return description
     
-    def create_embeddings(self, key_frames: List[Dict], text_segments: List[Dict]) -> List[Dict]:
-        """프레임과 텍스트를 결합하여 임베딩 데이터 생성"""
-        embeddings = []
+    def _apply_cached_descriptions(self, items: List[Dict]) -> List[Dict]:
+        """캐시에 시각 설명이 있는 item은 채우고, 분석이 필요한 item 목록만 반환"""
+        if self.cache is None:
+            return items
+        pending = []
+        for item in items:
+            cached = self._cached_description(item['analysis_base64'])
+            if cached is None:
+                pending.append(item)
+            else:
+                item['visual_description'] = cached
+        return pending
+    
+    def _analyze_frames(self, items: List[Dict]) -> List[Dict]:
+        """프레임들을 동시에 분석하여 각 item의 visual_description을 채움
+
+        동시 호출 수와 분당 요청 수를 제한하고, 일시적 오류는 백오프 후 재시도함.
+        batch_size > 1이면 여러 프레임을 한 요청으로 묶고, 응답 파싱에 실패한 배치는 프레임별 요청으로 다시 분석함.
+        반환: (끝내 실패한 프레임 [{'timestamp', 'error'}] - 시각 설명은 비워둠, 보낸 비전 요청 수 (재시도 제외))
+        """
+        requests = 0
+        if self.batch_size > 1:
+            requests += -(-len(items) // self.batch_size)
+            items = self._analyze_frame_batches(items)
+        requests += len(items)
+        
+        def progress(done, total):
+            print(f"  ✓ 프레임 분석 {done}/{total}")
         
+        descriptions, errors = map_concurrent(
+            self.describe_frame,
+            [item['analysis_base64'] for item in items],
+            max_workers=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            max_retries=self.max_retries,
+            on_done=progress
+        )
+        
+        failures = []
+        for i, item in enumerate(items):
+            if i in errors:
+                item['visual_description'] = ''
+                failures.append({'timestamp': item['timestamp'], 'error': str(errors[i])})
+                print(f"  ❌ [{self._format_timestamp(item['timestamp'])}] 프레임 분석 실패: {errors[i]}")
+            else:
+                item['visual_description'] = descriptions[i]
+        return failures, requests
+    
+    def _analyze_frame_batches(self, items: List[Dict]) -> List[Dict]:
+        """batch_size개씩 묶어 분석하고, 실패한 배치의 item 목록을 반환 (프레임별 재분석 대상)"""
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        
+        def progress(done, total):
+            print(f"  ✓ 배치 분석 {done}/{total}")
+        
+        results, errors = map_concurrent(
+            lambda batch: self.describe_frames([item['analysis_base64'] for item in batch]),
+            batches,
+            max_workers=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            max_retries=self.max_retries,
+            on_done=progress
+        )
+        
+        fallback_items = []
+        for b, batch in enumerate(batches):
+            if b in errors:
+                print(f"  ⚠️ 배치 {b+1} 분석 실패, 프레임별로 다시 분석: {errors[b]}")
+                fallback_items.extend(batch)
+                continue
+            for item, visual_description in zip(batch, results[b]):
+                item['visual_description'] = visual_description
+                item['batched'] = True
+        return fallback_items
+    
+    def create_embeddings(self, key_frames: List[Dict], text_segments: List[Dict], dedup: bool = True,
+                          audio_span: bool = True, max_audio_seconds: float = 60.0) -> List[Dict]:
+        """프레임과 텍스트를 결합하여 임베딩 데이터 생성
+
+        dedup=True면 지각 해시로 후보를 찾고 썸네일 픽셀 비교로 확인하여 이전 핵심 프레임과
+        같은 프레임(같은 슬라이드로 복귀 등)이면 비전 모델 호출 없이 기존 시각 설명을 재사용하고 새 타임스탬프만 기록함
+        audio_span=True면 각 핵심 프레임에 다음 핵심 프레임 전까지의 발화를 붙이되
+        프레임 이후 최대 max_audio_seconds초까지만 포함 (마지막 프레임이나 장면 전환이 드문 영상에서
+        전체 자막이 한 프레임에 붙지 않도록). False면 해당 시점을 포함하거나 가장 가까운 세그먼트 하나
+        """
         print(f"\n⏳ 임베딩 생성 중... ({len(key_frames)}개 프레임)")
         
+        # 1. 프레임별 준비: 인코딩, 해당 시간의 음성 텍스트, 중복 판정
+        transcript = TranscriptIndex(text_segments)
+        hash_index = FrameHashIndex(max_distance=self.dedup_distance, max_changed_ratio=self.dedup_changed_ratio)
+        prepared = []
+        
         for i, frame_data in enumerate(key_frames):
             try:
                 timestamp = frame_data['timestamp']
                 frame = frame_data['frame']
                 
-                # 프레임을 base64로 인코딩
-                frame_base64 = self.frame_to_base64(frame)
-                
                 # 해당 시간의 음성 텍스트 찾기
-                audio_text = self.find_text_at_timestamp(text_segments, timestamp)
-                
-                # GPT-4o-mini로 프레임 내용 분석
-                visual_description = self.analyze_frame_with_gpt4(frame_base64)
+                if audio_span:
+                    window_end = timestamp + max_audio_seconds
+                    if i + 1 < len(key_frames):
+                        window_end = min(window_end, key_frames[i + 1]['timestamp'])
+                    audio_text = transcript.text_between(timestamp, window_end)
+                else:
+                    audio_text = transcript.text_at(timestamp)
                 
-                # 검색용 요약 생성 (오디오 + 시각적 설명)
-                summary = f"""[{self._format_timestamp(timestamp)}]
-                            음성: {audio_text}
-                            화면: {visual_description}"""
-                
-                # 데이터 유효성 확인
-                if not summary.strip():
-                    print(f"⚠️  경고: {i}번째 프레임의 요약이 비어있음")
-                    continue
-                
-                embeddings.append({
+                item = {
                     'timestamp': timestamp,
-                    'summary': summary,
+                    # 저장/UI용 썸네일과 비전 모델 분석용 이미지를 따로 인코딩
+                    'frame_base64': self.frame_to_base64(
+                        frame, self.encoding.thumbnail_max_edge, self.encoding.thumbnail_quality
+                    ),
+                    'analysis_base64': self.frame_to_base64(
+                        frame, self.encoding.analysis_max_edge, self.encoding.analysis_quality
+                    ),
                     'audio_text': audio_text,
-                    'visual_description': visual_description,
-                    'frame_base64': frame_base64
-                })
+                    'duplicate_of': None
+                }
                 
-                print(f"  ✓ {i+1}/{len(key_frames)} - {self._format_timestamp(timestamp)}")
+                if dedup:
+                    frame_hash = dhash(frame)
+                    thumbnail = dedup_thumbnail(frame)
+                    original = hash_index.find(frame_hash, thumbnail)
+                    if original is None:
+                        hash_index.add(frame_hash, thumbnail, len(prepared))
+                    else:
+                        item['duplicate_of'] = original
                 
+                prepared.append(item)
+            
             except Exception as e:
                 print(f"  ❌ {i}번째 프레임 처리 실패: {e}")
                 continue
         
+        # 2. 대표 프레임만 GPT-4o-mini로 분석
+        unique_items = [item for item in prepared if item['duplicate_of'] is None]
+        # 이전에 분석한 적 있는 프레임은 캐시에서 가져오고 나머지만 배치/요청으로 분석
+        pending_items = self._apply_cached_descriptions(unique_items)
+        cache_hits = len(unique_items) - len(pending_items)
+        failures, vision_requests = self._analyze_frames(pending_items)
+        if self.cache is not None:
+            for item in pending_items:
+                if item['visual_description']:
+                    key = self._cache_key(item['analysis_base64'], batched=item.get('batched', False))
+                    self.cache.put(key, item['visual_description'])
+        
+        duplicate_count = len(prepared) - len(unique_items)
+        self.stats = {
+            'frames': len(prepared),
+            'analyzed': len(unique_items),
+            'duplicates': duplicate_count,
+            'dedup_ratio': duplicate_count / len(prepared) if prepared else 0.0,
+            'cache_hits': cache_hits,
+            'vision_requests': vision_requests,
+            'failures': failures
+        }
+        if dedup:
+            print(f"  → 중복 프레임 {duplicate_count}개 재사용 (중복률 {self.stats['dedup_ratio']:.0%})")
+        if cache_hits:
+            print(f"  → 시각 설명 캐시 적중 {cache_hits}개")
+        print(f"  → 비전 호출 {vision_requests}회 (분석 프레임 {len(pending_items)}/{len(prepared)}개)")
+        if failures:
+            print(f"  ⚠️ 프레임 분석 실패 {len(failures)}개 (시각 설명 없이 음성만 저장)")
+        
+        # 3. 검색용 요약 생성 (오디오 + 시각적 설명)
+        embeddings = []
+        for i, item in enumerate(prepared):
+            timestamp = item['timestamp']
+            audio_text = item['audio_text']
+            
+            original = item['duplicate_of']
+            if original is not None:
+                visual_description = prepared[original]['visual_description']
+            else:
+                visual_description = item['visual_description']
+            
+            summary = f"""[{self._format_timestamp(timestamp)}]
+                            음성: {audio_text}
+                            화면: {visual_description}"""
+            
+            # 데이터 유효성 확인
+            if not summary.strip():
+                print(f"⚠️  경고: {i}번째 프레임의 요약이 비어있음")
+                continue
+            
+            embedding = {
+                'timestamp': timestamp,
+                'summary': summary,
+                'audio_text': audio_text,
+                'visual_description': visual_description,
+                'frame_base64': item['frame_base64']
+            }
+            if original is not None:
+                embedding['duplicate_of'] = prepared[original]['timestamp']
+            embeddings.append(embedding)
+        
         print(f"✓ 임베딩 생성 완료! (총 {len(embeddings)}개)\n")
         return embeddings
     
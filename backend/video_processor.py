@@ -1,18 +1,48 @@
-import cv2
 import os
 import subprocess
-from typing import List, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator
 import base64
 from openai import OpenAI
+from ffmpeg_frames import iter_ffmpeg_key_frames
+from frame_reader import iter_video_frames
+from scene_detector import SceneChangeDetector
+from sharded_decoder import detect_key_frames_sharded
+from transcriber import ChunkedTranscriber, TranscriptionBackend, WhisperAPIBackend
 from dotenv import load_dotenv
 load_dotenv()
 
 """영상 전처리: 프레임 추출, 오디오 추출, STT"""
 class VideoProcessor:
-    def __init__(self, output_dir="./video_data"):
+    def __init__(self, output_dir="./video_data", transcription_backend: TranscriptionBackend = None,
+                 transcribe_workers: int = 4, decode_workers: int = 1, frame_engine: str = "opencv",
+                 fps: float = 1, scene_threshold: float = 25.0, ffmpeg_scene_threshold: float = 0.3,
+                 transcription_model: str = "whisper-1", chunking: Dict = None):
+        """
+        transcribe_workers: 동시에 전사할 오디오 청크 수
+        decode_workers: 2 이상이면 영상을 시간 구간으로 나눠 여러 프로세스에서 디코딩
+        frame_engine: 핵심 프레임 추출 엔진 기본값 ("opencv" 또는 "ffmpeg")
+        fps/scene_threshold: opencv 엔진의 샘플링 fps와 장면 전환 임계값 기본값
+        ffmpeg_scene_threshold: ffmpeg 엔진의 scene 점수 기준 기본값 (0~1, opencv 임계값과 척도가 다름)
+        transcription_model: transcription_backend가 없을 때 쓰는 Whisper API 모델
+        chunking: ChunkedTranscriber의 청크 분할/인코딩 설정 (max_chunk_seconds, codec, bitrate 등, None이면 기본값)
+        """
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.transcriber = ChunkedTranscriber(
+            transcription_backend or WhisperAPIBackend(self.client, model=transcription_model),
+            output_dir=output_dir,
+            max_workers=transcribe_workers,
+            **(chunking or {})
+        )
+        self.decode_workers = decode_workers
+        self.frame_engine = frame_engine
+        self.fps = fps
+        self.scene_threshold = scene_threshold
+        self.ffmpeg_scene_threshold = ffmpeg_scene_threshold
+        self.timings = {}
     
     def extract_audio(self, video_path: str) -> str:
         """FFmpeg로 오디오 추출"""
@@ -34,80 +64,111 @@ class VideoProcessor:
         print(f"✓ 오디오 추출 완료: {audio_path}")
         return audio_path
     
-    def extract_frames(self, video_path: str, fps: int = 1) -> List[Dict]:
-        """OpenCV로 프레임 추출 (fps: 초당 추출할 프레임 수)"""
-        cap = cv2.VideoCapture(video_path)
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(video_fps / fps)
-        
-        frames = []
-        frame_count = 0
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                timestamp = frame_count / video_fps
-                frames.append({
-                    'timestamp': timestamp,
-                    'frame': frame,
-                    'frame_number': frame_count
-                })
-            
-            frame_count += 1
-        
-        cap.release()
-        print(f"✓ 프레임 추출 완료: {len(frames)}개 프레임 (1fps)")
+    def extract_frames(self, video_path: str, fps: float = 1, stream: bool = False):
+        """OpenCV로 프레임 추출 (fps: 초당 추출할 프레임 수)
+
+        stream=True면 리스트 대신 제너레이터를 반환하여 프레임을 하나씩 넘김
+        """
+        if stream:
+            return self.iter_frames(video_path, fps=fps)
+
+        frames = list(self.iter_frames(video_path, fps=fps))
+        print(f"✓ 프레임 추출 완료: {len(frames)}개 프레임 ({fps}fps)")
         return frames
+
+    def iter_frames(self, video_path: str, fps: float = 1, seek: bool = False) -> Iterator[Dict]:
+        """샘플링 대상 프레임만 디코딩하여 하나씩 yield (frame_reader.iter_video_frames 참고)"""
+        return iter_video_frames(video_path, fps=fps, seek=seek)
     
-    def detect_scene_changes(self, frames: List[Dict], threshold: float = 30.0) -> List[Dict]:
+    def detect_scene_changes(self, frames: Iterable[Dict], threshold: float = 30.0) -> List[Dict]:
         """장면 전환 감지로 핵심 프레임 선택"""
-        if not frames:
-            return []
-        
-        key_frames = [frames[0]]  # 첫 프레임은 무조건 포함
-        
-        for i in range(1, len(frames)):
-            prev_frame = frames[i-1]['frame']
-            curr_frame = frames[i]['frame']
-            
-            # 프레임 간 차이 계산
-            diff = cv2.absdiff(prev_frame, curr_frame)
-            diff_score = diff.mean()
-            
-            if diff_score > threshold:  # 장면 전환 감지
-                key_frames.append(frames[i])
-        
+        key_frames = list(self.iter_key_frames(frames, threshold=threshold))
         print(f"✓ 핵심 프레임 선택 완료: {len(key_frames)}개 (장면 전환 기준)")
         return key_frames
+
+    def iter_key_frames(self, frames: Iterable[Dict], threshold: float = 30.0) -> Iterator[Dict]:
+        """프레임 이터레이터를 소비하며 핵심 프레임을 발견 즉시 yield
+
+        축소 grayscale 썸네일끼리 비교하고 최근 차이값 통계로 임계값을 조정함.
+        iter_frames()와 연결하면 디코딩과 감지가 겹쳐서 진행됨
+        """
+        detector = SceneChangeDetector(threshold=threshold)
+        return detector.detect(frames)
+    
+    def detect_scene_changes_sharded(self, video_path: str, fps: float = 1, threshold: float = 30.0) -> List[Dict]:
+        """영상을 시간 구간으로 나눠 프로세스 풀에서 디코딩 + 장면 감지 (긴 영상용)"""
+        key_frames = detect_key_frames_sharded(
+            video_path, fps=fps, threshold=threshold, max_workers=self.decode_workers
+        )
+        print(f"✓ 핵심 프레임 선택 완료: {len(key_frames)}개 (구간 병렬 처리)")
+        return key_frames
+    
+    def extract_key_frames_ffmpeg(self, video_path: str, scene_threshold: float = 0.3,
+                                  max_width: int = 1280) -> List[Dict]:
+        """FFmpeg select 필터로 장면 전환 프레임만 골라 축소된 상태로 받기"""
+        key_frames = list(iter_ffmpeg_key_frames(
+            video_path, scene_threshold=scene_threshold, max_width=max_width
+        ))
+        print(f"✓ 핵심 프레임 선택 완료: {len(key_frames)}개 (FFmpeg scene 필터)")
+        return key_frames
     
-    def transcribe_audio(self, audio_path: str) -> List[Dict]:
-        """Whisper API로 음성을 텍스트로 변환 (타임스탬프 포함)"""
+    def extract_key_frames(self, video_path: str, engine: str = None, fps: float = None,
+                           threshold: float = None, ffmpeg_threshold: float = None) -> List[Dict]:
+        """핵심 프레임 추출 (engine: "opencv" 또는 "ffmpeg", None이면 기본 엔진)
+
+        fps/threshold: opencv 엔진의 샘플링 fps와 장면 전환 임계값 (None이면 생성 시 지정한 값)
+        ffmpeg_threshold: ffmpeg 엔진의 scene 점수 기준 (None이면 생성 시 지정한 값)
+        엔진에 맞지 않는 임계값을 넘기면 무시하지 않고 ValueError 발생
+        """
+        engine = engine or self.frame_engine
+        if engine == "ffmpeg":
+            if threshold is not None:
+                raise ValueError("ffmpeg 엔진에는 threshold 대신 ffmpeg_threshold를 지정하세요")
+            scene_threshold = ffmpeg_threshold if ffmpeg_threshold is not None else self.ffmpeg_scene_threshold
+            return self.extract_key_frames_ffmpeg(video_path, scene_threshold=scene_threshold)
+        if engine != "opencv":
+            raise ValueError(f"지원하지 않는 프레임 추출 엔진입니다: {engine}")
+        if ffmpeg_threshold is not None:
+            raise ValueError("opencv 엔진에는 ffmpeg_threshold 대신 threshold를 지정하세요")
+        
+        fps = fps or self.fps
+        threshold = threshold if threshold is not None else self.scene_threshold
+        if self.decode_workers > 1:
+            return self.detect_scene_changes_sharded(video_path, fps=fps, threshold=threshold)
+        frames = self.extract_frames(video_path, fps=fps, stream=True)
+        return self.detect_scene_changes(frames, threshold=threshold)
+    
+    def transcribe_audio(self, audio_path: str, chunked: bool = True) -> List[Dict]:
+        """음성을 텍스트로 변환 (타임스탬프 포함)
+
+        chunked=True면 무음 구간 기준으로 잘라 병렬 전사 후 타임스탬프를 이어붙임
+        """
         print("⏳ 음성 변환 중... (시간이 걸릴 수 있습니다)")
         
-        with open(audio_path, "rb") as audio_file:
-            transcript = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["segment"]
-            )
-        
-        segments = []
-        for segment in transcript.segments:
-            segments.append({
-                'start': segment.start,
-                'end': segment.end,
-                'text': segment.text
-            })
+        if chunked:
+            segments = self.transcriber.transcribe(audio_path)
+        else:
+            segments = self.transcriber.backend.transcribe(audio_path)
         
         print(f"✓ 음성 변환 완료: {len(segments)}개 세그먼트")
         return segments
     
-    def process_video(self, video_path: str) -> tuple:
-        """영상 전체 처리 파이프라인"""
+    def _run_audio_branch(self, video_path: str) -> List[Dict]:
+        """오디오 추출 → 음성 변환 (FFmpeg 서브프로세스 + 네트워크 대기)"""
+        audio_path = self.extract_audio(video_path)
+        return self.transcribe_audio(audio_path)
+
+    def _run_visual_branch(self, video_path: str, engine: str = None) -> List[Dict]:
+        """프레임 추출 → 핵심 프레임 선택 (스트리밍 디코딩 + 장면 감지)"""
+        return self.extract_key_frames(video_path, engine=engine)
+
+    def process_video(self, video_path: str, concurrent: bool = True, frame_engine: str = None) -> tuple:
+        """영상 전체 처리 파이프라인
+
+        concurrent=True면 오디오(FFmpeg/STT) 브랜치와 영상(디코딩/장면 감지) 브랜치를
+        병렬로 실행한 뒤 합침. 브랜치별 소요 시간은 self.timings에 기록됨
+        frame_engine: 이번 호출에서 쓸 핵심 프레임 추출 엔진 (None이면 기본 엔진)
+        """
         # 파일 존재 확인 추가
         if not os.path.exists(video_path):
             # 절대 경로로 변환 시도
@@ -121,20 +182,36 @@ class VideoProcessor:
         print(f"영상 처리 시작: {video_path}")
         print(f"{'='*60}\n")
         
-        # 1. 오디오 추출
-        audio_path = self.extract_audio(video_path)
-        
-        # 2. 프레임 추출
-        all_frames = self.extract_frames(video_path, fps=1)
-        
-        # 3. 핵심 프레임 선택
-        key_frames = self.detect_scene_changes(all_frames, threshold=25.0)
-        
-        # 4. 음성 → 텍스트
-        text_segments = self.transcribe_audio(audio_path)
+        started = time.perf_counter()
+        self.timings = {}
+
+        def timed(name, fn, **kwargs):
+            branch_started = time.perf_counter()
+            try:
+                return fn(video_path, **kwargs)
+            finally:
+                self.timings[name] = time.perf_counter() - branch_started
+
+        if concurrent:
+            # OpenCV 디코딩과 FFmpeg/HTTP 대기는 GIL을 놓으므로 스레드로 충분
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                audio_future = executor.submit(timed, 'audio', self._run_audio_branch)
+                visual_future = executor.submit(timed, 'visual', self._run_visual_branch, engine=frame_engine)
+                key_frames = visual_future.result()
+                text_segments = audio_future.result()
+        else:
+            # 1~3. 프레임 추출 + 핵심 프레임 선택
+            key_frames = timed('visual', self._run_visual_branch, engine=frame_engine)
+            # 4. 오디오 추출 → 음성 변환
+            text_segments = timed('audio', self._run_audio_branch)
+
+        self.timings['total'] = time.perf_counter() - started
         
         print(f"\n{'='*60}")
         print("영상 처리 완료!")
+        print(f"  - 오디오 브랜치: {self.timings['audio']:.1f}초")
+        print(f"  - 영상 브랜치: {self.timings['visual']:.1f}초")
+        print(f"  - 전체: {self.timings['total']:.1f}초")
         print(f"{'='*60}\n")
         
-        return key_frames, text_segments
\ No newline at end of file
+        return key_frames, text_segments
@@ -1,20 +1,70 @@
 import shutil
-from typing import List, Dict
+from typing import List, Dict, Iterator, Tuple
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-import uuid
+from frame_store import FramePackStore
+from llm_concurrency import map_concurrent
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from temporal_retrieval import build_where, merge_adjacent, select_diverse
+import chromadb
+import threading
+import time
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# 프로세스 전역 공유 자원: 열린 스토어, 임베딩 클라이언트, 디렉토리별 Chroma 클라이언트
+_stores = {}
+_embedding_function = None
+_chroma_clients = {}
+_registry_lock = threading.RLock()
+
+def get_embedding_function() -> OpenAIEmbeddings:
+    """공유 OpenAIEmbeddings 클라이언트 (HTTP 연결 재사용)"""
+    global _embedding_function
+    with _registry_lock:
+        if _embedding_function is None:
+            _embedding_function = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        return _embedding_function
+
+def get_chroma_client(persist_directory: str):
+    """persist_directory별 공유 Chroma 클라이언트"""
+    with _registry_lock:
+        client = _chroma_clients.get(persist_directory)
+        if client is None:
+            client = chromadb.PersistentClient(path=persist_directory)
+            _chroma_clients[persist_directory] = client
+        return client
+
+def get_video_store(collection_name: str = "video-segments", persist_directory: str = "./video_rag") -> "VideoVectorStore":
+    """컬렉션별로 한 번만 연 VideoVectorStore를 재사용"""
+    key = (persist_directory, collection_name)
+    with _registry_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = VideoVectorStore(collection_name=collection_name, persist_directory=persist_directory)
+            _stores[key] = store
+        return store
+
 class VideoVectorStore:
-    def __init__(self, collection_name: str = "video-segments", persist_directory: str = "./video_rag"):
+    def __init__(self, collection_name: str = "video-segments", persist_directory: str = "./video_rag",
+                 debug: bool = None):
+        """debug: 저장 후 검증 검색 등 확인용 쿼리 실행 여부 (None이면 VIDEO_RAG_DEBUG 환경변수)"""
         self.collection_name = collection_name
         self.persist_directory = persist_directory
+        if debug is None:
+            debug = os.getenv("VIDEO_RAG_DEBUG", "").lower() in ("1", "true", "yes")
+        self.debug = debug
         
-        # 임베딩 함수 초기화
-        self.embedding_function = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        # 컬렉션 문서 수 캐시 (쓰기 후 갱신)
+        self._count = None
+        
+        # 프레임 이미지는 메타데이터 대신 별도 팩 파일에 저장 (메타데이터에는 참조 번호만)
+        self.frame_store = FramePackStore(persist_directory, collection_name)
+        
+        # 임베딩 함수 초기화 (프로세스 전역 공유)
+        self.embedding_function = get_embedding_function()
         
         # Chroma 버전 충돌 방지
         try:
@@ -22,7 +72,8 @@ class VideoVectorStore:
             self.vectorstore = Chroma(
                 collection_name=collection_name,
                 embedding_function=self.embedding_function,
-                persist_directory=persist_directory
+                persist_directory=persist_directory,
+                client=get_chroma_client(persist_directory)
             )
         except Exception as e:
             error_msg = str(e)
@@ -38,27 +89,54 @@ class VideoVectorStore:
                         shutil.rmtree(persist_directory)
                         print(f"✅ {persist_directory} 삭제 완료")
                     
-                    # 재시도
+                    # 재시도 (삭제된 DB를 가리키는 공유 클라이언트는 버림)
+                    with _registry_lock:
+                        _chroma_clients.pop(persist_directory, None)
+                    self.frame_store = FramePackStore(persist_directory, collection_name)
                     self.vectorstore = Chroma(
                         collection_name=collection_name,
                         embedding_function=self.embedding_function,
-                        persist_directory=persist_directory
+                        persist_directory=persist_directory,
+                        client=get_chroma_client(persist_directory)
                     )
                 else:
                     raise
             else:
                 raise
+        
+        # 음성/화면 설명 BM25 역색인 (정확한 용어 검색용, Chroma 디렉토리 옆에 저장)
+        self.lexical_index = BM25Index(os.path.join(persist_directory, "lexical", f"{collection_name}.json"))
+        if len(self.lexical_index) == 0 and self.count() > 0:
+            # 역색인 도입 전에 만든 컬렉션은 한 번만 전체를 읽어 색인
+            self.rebuild_lexical_index()
     
-    def store_video_embeddings(self, video_id: str, embeddings: List[Dict]):
-        """영상 임베딩을 벡터 DB에 저장"""
+    def count(self, refresh: bool = False) -> int:
+        """컬렉션 문서 수 (캐시된 값, refresh=True면 DB에서 다시 조회)"""
+        if self._count is None or refresh:
+            self._count = self.vectorstore._collection.count()
+        return self._count
+    
+    def _make_doc_id(self, video_id: str, timestamp: float) -> str:
+        """영상 ID + 타임스탬프(ms)로 만든 결정적 ID (재시도해도 같은 문서를 덮어씀)"""
+        return f"{video_id}_{int(round(timestamp * 1000))}"
+    
+    def store_video_embeddings(self, video_id: str, embeddings: List[Dict], batch_size: int = 64,
+                               max_workers: int = 4) -> Dict:
+        """영상 임베딩을 벡터 DB에 저장
+
+        batch_size개씩 나눠 임베딩을 동시에 요청하고, 성공한 배치부터 upsert함.
+        ID가 결정적이라 실패한 배치만 다시 호출해도 중복 문서가 생기지 않음.
+        반환: {'stored': 저장된 문서 수, 'batches': 배치별 소요 시간, 'failed': 실패한 배치}
+        """
+        report = {'stored': 0, 'batches': [], 'failed': []}
         print(f"\n⏳ 벡터 DB 저장 중... ({len(embeddings)}개 세그먼트)")
         
         if not embeddings:
             print("❌ 저장할 임베딩이 없습니다!")
-            return
+            return report
         
-        # Document 객체 리스트 생성
-        documents = []
+        # 1. 저장할 레코드 생성 (같은 ID는 마지막 것만 유지)
+        records = {}
         
         for i, emb in enumerate(embeddings):
             # summary가 None이 아닌지 확인
@@ -67,60 +145,188 @@ class VideoVectorStore:
                 print(f"⚠️  경고: {i}번째 임베딩의 summary가 비어있음")
                 continue
             
-            # Document 객체 생성
-            doc = Document(
-                page_content=summary,
-                metadata={
+            timestamp = float(emb.get('timestamp', 0))
+            doc_id = self._make_doc_id(video_id, timestamp)
+            records[doc_id] = {
+                'summary': summary,
+                'frame_base64': emb.get('frame_base64', ''),
+                'metadata': {
                     'video_id': video_id,
-                    'timestamp': float(emb.get('timestamp', 0)),
+                    'timestamp': timestamp,
                     'audio_text': emb.get('audio_text', ''),
                     'visual_description': emb.get('visual_description', ''),
-                    'frame_base64': emb.get('frame_base64', ''),
-                    'doc_id': f"{video_id}_{i}_{uuid.uuid4()}"
+                    'doc_id': doc_id
                 }
-            )
-            documents.append(doc)
+            }
         
-        print(f"실제 저장할 문서: {len(documents)}개")
+        print(f"실제 저장할 문서: {len(records)}개")
         
-        if not documents:
+        if not records:
             print("❌ 저장할 유효한 문서가 없습니다!")
-            return
+            return report
         
-        try:
-            # add_documents 메서드 사용 (Document 객체 리스트 전달)
-            ids = [doc.metadata['doc_id'] for doc in documents]
-            self.vectorstore.add_documents(documents=documents, ids=ids)
+        ids = list(records)
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        
+        # 2. 배치별 임베딩을 동시에 요청 (일시적 오류는 백오프 후 재시도)
+        def embed_batch(batch_ids):
+            started = time.perf_counter()
+            vectors = self.embedding_function.embed_documents([records[doc_id]['summary'] for doc_id in batch_ids])
+            return vectors, time.perf_counter() - started
+        
+        results, errors = map_concurrent(embed_batch, batches, max_workers=max_workers)
+        
+        # 3. 성공한 배치를 순서대로 upsert
+        for b, batch_ids in enumerate(batches):
+            if b in errors:
+                print(f"  ❌ 배치 {b+1}/{len(batches)} 임베딩 실패 ({len(batch_ids)}개): {errors[b]}")
+                report['failed'].append({'batch': b, 'ids': batch_ids, 'error': str(errors[b])})
+                continue
             
-            # 저장 확인
-            count = self.vectorstore._collection.count()
-            print(f"✓ 벡터 DB 저장 완료! (총 {count}개 문서)")
+            vectors, embed_seconds = results[b]
+            started = time.perf_counter()
+            try:
+                metadatas = self._attach_frames(batch_ids, records)
+                self.vectorstore._collection.upsert(
+                    ids=batch_ids,
+                    embeddings=vectors,
+                    metadatas=metadatas,
+                    documents=[records[doc_id]['summary'] for doc_id in batch_ids]
+                )
+            except Exception as e:
+                print(f"  ❌ 배치 {b+1}/{len(batches)} 저장 실패 ({len(batch_ids)}개): {e}")
+                report['failed'].append({'batch': b, 'ids': batch_ids, 'error': str(e)})
+                continue
             
-            # 첫 번째 문서 확인
-            if count > 0:
-                test_results = self.vectorstore.similarity_search("test", k=1)
-                if test_results:
-                    print(f"✓ 저장 검증 성공:")
-                    print(f"  - 페이지 내용 길이: {len(test_results[0].page_content)}")
-                    print(f"  - 메타데이터 키: {list(test_results[0].metadata.keys())}")
-                    print(f"  - timestamp: {test_results[0].metadata.get('timestamp')}")
-                    print(f"  - frame_base64 존재: {'frame_base64' in test_results[0].metadata}")
+            upsert_seconds = time.perf_counter() - started
+            for doc_id, metadata in zip(batch_ids, metadatas):
+                self._index_lexical(doc_id, metadata)
+            report['stored'] += len(batch_ids)
+            report['batches'].append({'batch': b, 'size': len(batch_ids),
+                                      'embed_seconds': embed_seconds, 'upsert_seconds': upsert_seconds})
+            print(f"  ✓ 배치 {b+1}/{len(batches)}: {len(batch_ids)}개 "
+                  f"(임베딩 {embed_seconds:.2f}초, 저장 {upsert_seconds:.2f}초)")
         
-        except Exception as e:
-            print(f"❌ 벡터 DB 저장 실패: {e}")
-            import traceback
-            traceback.print_exc()
+        self.lexical_index.save()
+        
+        # 저장 확인 (문서 수 캐시 갱신)
+        count = self.count(refresh=True)
+        print(f"✓ 벡터 DB 저장 완료! ({report['stored']}개 저장, 실패 배치 {len(report['failed'])}개, 총 {count}개 문서)")
+        
+        # 첫 번째 문서 확인 (디버그 모드에서만)
+        if self.debug and count > 0:
+            test_results = self.vectorstore.similarity_search("test", k=1)
+            if test_results:
+                print(f"✓ 저장 검증 성공:")
+                print(f"  - 페이지 내용 길이: {len(test_results[0].page_content)}")
+                print(f"  - 메타데이터 키: {list(test_results[0].metadata.keys())}")
+                print(f"  - timestamp: {test_results[0].metadata.get('timestamp')}")
+                print(f"  - frame_ref: {test_results[0].metadata.get('frame_ref')}")
+        
+        return report
+    
+    def _index_lexical(self, doc_id: str, metadata: Dict):
+        """음성 텍스트와 화면 설명을 BM25 역색인에 추가"""
+        self.lexical_index.add(
+            doc_id,
+            f"{metadata.get('audio_text', '')} {metadata.get('visual_description', '')}",
+            {'timestamp': metadata.get('timestamp', 0), 'video_id': metadata.get('video_id', '')}
+        )
+    
+    def rebuild_lexical_index(self):
+        """컬렉션 전체를 순회하여 BM25 역색인을 다시 생성"""
+        print(f"⏳ 키워드 색인 생성 중... ({self.collection_name})")
+        for doc in self.iter_documents(fields=['doc_id', 'audio_text', 'visual_description', 'timestamp', 'video_id']):
+            if doc.metadata.get('doc_id'):
+                self._index_lexical(doc.metadata['doc_id'], doc.metadata)
+        self.lexical_index.save()
+        print(f"✓ 키워드 색인 완료: {len(self.lexical_index)}개 문서")
     
-    def search(self, query: str, k: int = 3, top_k: int = None) -> List[Dict]:
-        """쿼리에 맞는 영상 세그먼트 검색"""
+    def _attach_frames(self, batch_ids: List[str], records: Dict) -> List[Dict]:
+        """배치의 프레임을 팩 파일에 저장하고 frame_ref가 들어간 메타데이터 반환
+
+        이미 저장된 문서(재시도)는 기존 frame_ref를 재사용하여 팩 파일에 중복 기록하지 않음
+        """
+        existing = self.vectorstore._collection.get(ids=batch_ids, include=["metadatas"])
+        existing_refs = {
+            doc_id: metadata.get('frame_ref', -1)
+            for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+        }
+        
+        metadatas = []
+        for doc_id in batch_ids:
+            record = records[doc_id]
+            # 프레임은 팩 파일에 저장하고 참조 번호만 메타데이터에 기록 (-1: 프레임 없음)
+            frame_ref = existing_refs.get(doc_id, -1)
+            if frame_ref < 0 and record['frame_base64']:
+                frame_ref = self.frame_store.append_base64(record['frame_base64'])
+            metadatas.append({**record['metadata'], 'frame_ref': frame_ref})
+        return metadatas
+    
+    def _make_candidate(self, text: str, metadata: Dict, relevance: float) -> Dict:
+        return {
+            'timestamp': metadata.get('timestamp', 0),
+            'audio_text': metadata.get('audio_text', ''),
+            'visual_description': metadata.get('visual_description', ''),
+            # 프레임 이미지는 필요할 때 load_frame(frame_ref)으로 조회
+            'frame_ref': metadata.get('frame_ref', -1),
+            'summary': text,
+            'metadata': metadata,
+            'text': metadata.get('audio_text', ''),  # rag_service에서 사용
+            'relevance': relevance
+        }
+    
+    def _hybrid_candidates(self, query: str, dense_results: List, candidate_k: int,
+                           time_range, video_id, rrf_k: int = 60) -> List[Dict]:
+        """벡터 검색 순위와 BM25 순위를 RRF로 결합한 후보 목록 (relevance는 0~1로 정규화)"""
+        dense = {}
+        for i, (doc, _) in enumerate(dense_results):
+            # doc_id 메타데이터가 없는 구버전 문서는 벡터 순위로만 참여
+            doc_id = doc.metadata.get('doc_id') or f"__dense_{i}"
+            dense.setdefault(doc_id, doc)
+        lexical_hits = self.lexical_index.search(query, k=candidate_k, time_range=time_range, video_id=video_id)
+        
+        fused = reciprocal_rank_fusion([list(dense), [doc_id for doc_id, _ in lexical_hits]], k=rrf_k)
+        if not fused:
+            return []
+        
+        # 키워드로만 찾은 문서는 Chroma에서 내용과 메타데이터를 가져옴
+        documents = {doc_id: (doc.page_content, doc.metadata) for doc_id, doc in dense.items()}
+        missing = [doc_id for doc_id in fused if doc_id not in documents]
+        if missing:
+            fetched = self.vectorstore._collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, text, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                documents[doc_id] = (text or '', metadata or {})
+        
+        best = max(fused.values())
+        candidates = []
+        for doc_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            if doc_id in documents:
+                text, metadata = documents[doc_id]
+                candidates.append(self._make_candidate(text, metadata, score / best))
+        return candidates
+    
+    def search(self, query: str, k: int = 3, top_k: int = None, time_range: Tuple[float, float] = None,
+               video_id: str = None, fetch_k: int = None, merge_gap: float = 10.0,
+               diversity: float = 0.3, time_scale: float = 60.0, hybrid: bool = True) -> List[Dict]:
+        """쿼리에 맞는 영상 세그먼트 검색
+
+        time_range: (시작초, 끝초) 범위의 세그먼트만 검색
+        video_id: 특정 영상의 세그먼트만 검색
+        fetch_k: 후처리 전에 가져올 후보 수 (기본 k의 4배)
+        merge_gap: 같은 영상에서 이 간격(초) 이하로 붙은 후보를 하나의 구간으로 병합 (None이면 병합 안 함)
+        diversity/time_scale: 시간 축 MMR 강도와 시간 척도(초). diversity=0이면 관련도 순
+        hybrid: 벡터 검색에 BM25 키워드 검색을 RRF로 결합 (제품명, 숫자, 약어 등 정확한 용어에 강함)
+        """
         # top_k가 명시적으로 전달되면 우선, 아니면 k 사용
         search_k = top_k if top_k is not None else k
         
         print(f"\n⏳ '{query}' 검색 중...")
         
-        # 저장된 문서 수 확인
+        # 저장된 문서 수 확인 (캐시된 값이라 추가 쿼리 없음)
+        count = None
         try:
-            count = self.vectorstore._collection.count()
+            count = self.count()
             print(f"현재 저장된 문서: {count}개")
             
             if count == 0:
@@ -130,26 +336,33 @@ class VideoVectorStore:
             print(f"⚠️  문서 수 확인 실패: {e}")
         
         try:
-            results = self.vectorstore.similarity_search(query, k=search_k)
+            candidate_k = fetch_k or search_k * 4
+            if count:
+                candidate_k = min(candidate_k, count)
             
-            if not results:
+            results = self.vectorstore.similarity_search_with_score(
+                query, k=candidate_k, filter=build_where(time_range, video_id)
+            )
+            
+            if hybrid:
+                candidates = self._hybrid_candidates(query, results, candidate_k, time_range, video_id)
+            else:
+                candidates = [
+                    self._make_candidate(result.page_content, result.metadata, 1.0 / (1.0 + distance))
+                    for result, distance in results
+                ]
+            
+            if not candidates:
                 print("❌ 검색 결과가 없습니다!")
                 return []
             
-            print(f"✓ {len(results)}개 세그먼트 발견")
-            
-            segments = []
-            for result in results:
-                segments.append({
-                    'timestamp': result.metadata.get('timestamp', 0),
-                    'audio_text': result.metadata.get('audio_text', ''),
-                    'visual_description': result.metadata.get('visual_description', ''),
-                    'frame_base64': result.metadata.get('frame_base64', ''),
-                    'summary': result.page_content,
-                    'metadata': result.metadata,
-                    'text': result.metadata.get('audio_text', '')  # rag_service에서 사용
-                })
+            # 인접 후보를 구간으로 합친 뒤 타임라인에 고르게 퍼지도록 선택
+            candidate_count = len(candidates)
+            if merge_gap is not None:
+                candidates = merge_adjacent(candidates, max_gap=merge_gap)
+            segments = select_diverse(candidates, search_k, diversity=diversity, time_scale=time_scale)
             
+            print(f"✓ {len(segments)}개 구간 발견 (후보 {candidate_count}개)")
             return segments
         
         except Exception as e:
@@ -158,17 +371,56 @@ class VideoVectorStore:
             traceback.print_exc()
             return []
     
-    def get_all_documents(self) -> List[Document]:
-        """저장된 모든 문서 조회 (디버깅용)"""
+    def load_frame(self, frame_ref) -> str:
+        """프레임 참조 번호로 base64 JPEG 조회 (없으면 빈 문자열)"""
+        if frame_ref is None or int(frame_ref) < 0:
+            return ''
         try:
-            count = self.vectorstore._collection.count()
-            if count == 0:
-                print("저장된 문서가 없습니다.")
-                return []
+            return self.frame_store.get_base64(frame_ref)
+        except KeyError:
+            print(f"⚠️  프레임을 찾을 수 없습니다: {frame_ref}")
+            return ''
+    
+    def iter_documents(self, page_size: int = 256, where: Dict = None, fields: List[str] = None,
+                       include_frames: bool = False) -> Iterator[Document]:
+        """저장된 문서를 페이지 단위로 순회 (임베딩/유사도 검색 없이 컬렉션을 직접 조회)
+
+        where: Chroma 메타데이터 필터 (예: {"video_id": "..."})
+        fields: 가져올 메타데이터 키 목록 (None이면 전부)
+        include_frames: True면 frame_ref로 프레임을 읽어 metadata['frame_base64']에 넣음.
+                        False면 구버전 컬렉션의 frame_base64 메타데이터도 제외
+        """
+        offset = 0
+        while True:
+            page = self.vectorstore._collection.get(
+                limit=page_size,
+                offset=offset,
+                where=where,
+                include=["documents", "metadatas"]
+            )
+            ids = page['ids']
+            if not ids:
+                break
+            
+            for text, metadata in zip(page['documents'], page['metadatas']):
+                metadata = dict(metadata or {})
+                if include_frames:
+                    if 'frame_base64' not in metadata:
+                        metadata['frame_base64'] = self.load_frame(metadata.get('frame_ref', -1))
+                else:
+                    metadata.pop('frame_base64', None)
+                if fields is not None:
+                    metadata = {key: metadata[key] for key in fields if key in metadata}
+                yield Document(page_content=text or '', metadata=metadata)
             
-            # 더미 쿼리로 모든 문서 가져오기
-            results = self.vectorstore.similarity_search("", k=count)
-            return results
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+    
+    def get_all_documents(self, where: Dict = None, fields: List[str] = None) -> List[Document]:
+        """저장된 모든 문서 조회 (디버깅용, 큰 컬렉션은 iter_documents로 순회)"""
+        try:
+            return list(self.iter_documents(where=where, fields=fields))
         except Exception as e:
             print(f"문서 조회 실패: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,62 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import fitz
+
+# backend 모듈 사용
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from pdf_extractor import extract_pdf_elements, categorize_elements
+
+# PDF 파싱 엔진 비교: 초당 페이지 수와 추출 결과(텍스트 청크/표/이미지 수)
+# 사용법: python benchmark_engines.py [pdf 경로 ...]  (기본: ../input/*.pdf)
+
+pdf_paths = [os.path.abspath(p) for p in sys.argv[1:]] or sorted(
+    glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "input", "*.pdf"))
+)
+engines = ["unstructured", "pymupdf"]
+
+if not pdf_paths:
+    print("❌ 비교할 PDF가 없습니다")
+    sys.exit(1)
+
+# 벤치마크 이미지는 임시 폴더에 저장하고 끝나면 삭제
+figure_root = tempfile.mkdtemp(prefix="pdf_benchmark_")
+os.chdir(figure_root)
+
+totals = {engine: {"pages": 0, "seconds": 0.0} for engine in engines}
+
+print(f"{'파일':<24}{'엔진':<14}{'페이지':>6}{'시간(초)':>10}{'페이지/초':>10}{'텍스트':>8}{'표':>6}{'이미지':>8}")
+for pdf_path in pdf_paths:
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    for engine in engines:
+        started = time.perf_counter()
+        raw_elements, _, image_paths = extract_pdf_elements(
+            os.path.dirname(pdf_path), os.path.basename(pdf_path), f"benchmark_{engine}", engine=engine
+        )
+        texts, tables, image_count = categorize_elements(raw_elements, image_paths)
+        seconds = time.perf_counter() - started
+
+        totals[engine]["pages"] += page_count
+        totals[engine]["seconds"] += seconds
+        print(f"{os.path.basename(pdf_path)[:22]:<24}{engine:<14}{page_count:>6}{seconds:>10.2f}"
+              f"{page_count / seconds:>10.2f}{len(texts):>8}{len(tables):>6}{image_count:>8}")
+
+print("\n=== 합계 ===")
+for engine in engines:
+    pages, seconds = totals[engine]["pages"], totals[engine]["seconds"]
+    print(f"{engine:<14}{pages}페이지 {seconds:.2f}초 → {pages / seconds:.2f} 페이지/초")
+
+base = totals["unstructured"]["seconds"]
+if totals["pymupdf"]["seconds"] > 0:
+    print(f"\npymupdf 속도: unstructured 대비 {base / totals['pymupdf']['seconds']:.1f}배")
+
+shutil.rmtree(figure_root, ignore_errors=True)